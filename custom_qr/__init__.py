@@ -1,7 +1,10 @@
 # from .qr_code import QrCode
 from .qrCode import QrCode
+from .asyncQrCode import AsyncQrCode
 from .constraints import (
     MODE_NUMBER, MODE_ALPHANUMERIC, MODE_BYTE, MODE_KANJI, MODE_ECI,
-    MODE_MIXED, ERROR_CORRECTION_LEVEL_L, ERROR_CORRECTION_LEVEL_M,
-    ERROR_CORRECTION_LEVEL_Q, ERROR_CORRECTION_LEVEL_H, EC_CODEWORDS
+    MODE_MIXED, MODE_STRUCTURED_APPEND, ERROR_CORRECTION_LEVEL_L, ERROR_CORRECTION_LEVEL_M,
+    ERROR_CORRECTION_LEVEL_Q, ERROR_CORRECTION_LEVEL_H, EC_CODEWORDS,
+    MASK_STRATEGY_FULL, MASK_STRATEGY_PRUNED, MASK_STRATEGY_FIXED,
+    ENGINE_NUMPY, ENGINE_BITBOARD
 )
@@ -0,0 +1,78 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from .qrCode import QrCode
+from .constraints import ERROR_CORRECTION_LEVEL_Q, MASK_STRATEGY_FULL, ENGINE_BITBOARD
+
+
+class AsyncQrCode:
+    """
+    asyncio counterpart of QrCode: generation, rendering and encoding run on an executor, so they
+    don't block the event loop
+
+    executor: concurrent.futures executor running the work, a thread pool of `max_concurrency`
+        threads by default (a process pool works too)
+    max_concurrency: calls running at once, the others wait without taking an executor worker
+
+    A cancelled call that hasn't started doesn't run. One already running finishes in its worker
+    and keeps its place in the limit until then, its result is dropped.
+    """
+    def __init__(self, engine=ENGINE_BITBOARD, executor=None, max_concurrency=4):
+        self.qr = QrCode(engine)
+        self._own_executor = executor is None
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency) if executor is None else executor
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+        self._loop = None
+
+    async def agenerate(self, data, version=None, error_correction=ERROR_CORRECTION_LEVEL_Q,
+                        mask_strategy=MASK_STRATEGY_FULL, mask=None, mode=None):
+        return await self._run(self.qr.generate, data, version, error_correction, mask_strategy, mask, mode)
+
+    async def arender(self, matrix,
+                      background=(255,255,255),
+                      block_style={"size": 10, "type" : 0, "color":[(0,0,0)]},
+                      finder_style=None,
+                      alignment_style=None):
+        return await self._run(self.qr.create_qr_image, matrix, background, block_style, finder_style, alignment_style)
+
+    async def aencode_png(self, img):
+        return await self._run(self.qr.encode_png, img)
+
+    async def _run(self, function, *args):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # a semaphore belongs to the loop it's used in
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        semaphore = self._semaphore
+        await semaphore.acquire()
+        try:
+            future = self.executor.submit(partial(function, *args))
+        except BaseException:
+            semaphore.release()
+            raise
+        # the place is released when the work is over, not when the caller stops waiting for it
+        future.add_done_callback(lambda _: self._release(loop, semaphore))
+        return await asyncio.wrap_future(future)
+
+    @staticmethod
+    def _release(loop, semaphore):
+        try:
+            loop.call_soon_threadsafe(semaphore.release)
+        except RuntimeError:
+            # the loop is closed, and its semaphore with it
+            pass
+
+    def close(self):
+        """
+        Stop the default executor, after the running calls
+        """
+        if self._own_executor:
+            self.executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
@@ -0,0 +1,52 @@
+import numpy as np
+
+
+class BitBuffer:
+    """
+    Bit writer, most significant bit first
+
+    Whole bytes go to a bytearray, the last incomplete byte stays in a small integer accumulator,
+    so appending doesn't copy what is already written.
+    """
+    def __init__(self):
+        self._bytes = bytearray()
+        self._accumulator = 0
+        self._pending = 0
+
+    def __len__(self):
+        return len(self._bytes) * 8 + self._pending
+
+    def append(self, value: int, length: int):
+        self._accumulator = (self._accumulator << length) | value
+        self._pending += length
+        if self._pending >= 8:
+            count, self._pending = divmod(self._pending, 8)
+            self._bytes += (self._accumulator >> self._pending).to_bytes(count, 'big')
+            self._accumulator &= (1 << self._pending) - 1
+
+    def append_bytes(self, data, length=None):
+        """
+        Append the first `length` bits of a bytes-like object, all of them by default
+        """
+        if length is None:
+            length = len(data) * 8
+        if self._pending or length % 8:
+            self.append(int.from_bytes(data, 'big') >> (len(data) * 8 - length), length)
+        else:
+            self._bytes += data
+
+    def append_values(self, values, length: int):
+        """
+        Append every value of an integer array on `length` bits
+        """
+        values = np.asarray(values, dtype=np.uint32)
+        bits = (values[:, np.newaxis] >> np.arange(length - 1, -1, -1, dtype=np.uint32)) & 1
+        self.append_bytes(np.packbits(bits.astype(np.uint8)).tobytes(), values.size * length)
+
+    def to_bytes(self) -> bytes:
+        """
+        Content of the buffer, the last byte is completed with zeros
+        """
+        if self._pending:
+            return bytes(self._bytes) + (self._accumulator << (8 - self._pending)).to_bytes(1, 'big')
+        return bytes(self._bytes)
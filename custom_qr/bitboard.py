@@ -0,0 +1,199 @@
+from operator import itemgetter
+import numpy as np
+from .constraints import MASK_STRATEGY_FIXED, MASK_STRATEGY_PRUNED
+from .layout import get_layout, FORMAT_INFORMATION
+
+_BITBOARDS = {}
+# from this size (version 9) the finder patterns pruning skips cost less than ordering the
+# candidates, so the pruned strategy scores them all
+PRUNING_MAX_SIZE = 53
+
+try:
+    _popcount = int.bit_count
+except AttributeError:  # python < 3.10
+    def _popcount(value):
+        return bin(value).count("1")
+
+
+def get_bitboard(version):
+    """
+    Return the cached Bitboard of the version, building it on first use
+    """
+    bitboard = _BITBOARDS.get(version)
+    if bitboard is None:
+        bitboard = _BITBOARDS.setdefault(version, Bitboard(version))
+    return bitboard
+
+
+class Bitboard:
+    """
+    Mask selection engine working on whole symbols stored in Python integers
+
+    A matrix is stored twice: line by line (module at row, column is bit row * width + column)
+    and transposed (bit column * width + row). Every line is followed by a padding bit that is
+    always light, so runs and windows never continue from one line to the next.
+    Masks and penalty rules become shifts, ANDs and popcounts over the whole symbol.
+    """
+    def __init__(self, version):
+        layout = get_layout(version)
+        self.layout = layout
+        self.size = size = layout.size
+        self.width = width = size + 1
+
+        self.template = self._to_boards(layout.template)
+        self.masks = [self._to_boards(mask) for mask in layout.masks]
+        self._formats = {}
+        self._placements = {}
+
+        column = np.arange(width)
+        row = np.arange(size)[:, np.newaxis]
+        self.modules = self._to_board((column < size) & (row >= 0))
+        self.block_starts = self._to_board((column < size - 1) & (row < size - 1))
+        # windows start from 0 to size - 12, as in the numpy scorer
+        self.finder_starts = self._to_board((column < size - 11) & (row >= 0))
+
+    def _to_board(self, matrix):
+        # matrix with `width` columns, in the line by line layout
+        bits = np.packbits(np.asarray(matrix, dtype=np.uint8), axis=None, bitorder='little')
+        return int.from_bytes(bits.tobytes(), 'little')
+
+    def _to_boards(self, matrix):
+        padded = np.zeros((self.size, self.width), dtype=np.uint8)
+        padded[:, :self.size] = matrix
+        transposed = np.zeros((self.size, self.width), dtype=np.uint8)
+        transposed[:, :self.size] = np.asarray(matrix).T
+        return self._to_board(padded), self._to_board(transposed)
+
+    def to_matrix(self, board):
+        count = self.size * self.width
+        data = np.frombuffer(board.to_bytes((count + 7) // 8, 'little'), dtype=np.uint8)
+        bits = np.unpackbits(data, count=count, bitorder='little')
+        return bits.reshape(self.size, self.width)[:, :self.size].copy()
+
+    def _get_formats(self, error_correction):
+        formats = self._formats.get(error_correction)
+        if formats is None:
+            layout = self.layout
+            formats = []
+            for format_bits in FORMAT_INFORMATION[error_correction]:
+                matrix = np.zeros((self.size, self.size), dtype=np.uint8)
+                matrix[layout.format_rows, layout.format_columns] = format_bits[layout.format_bits]
+                formats.append(self._to_boards(matrix))
+            self._formats[error_correction] = formats
+        return formats
+
+    def _get_placement(self, count):
+        """
+        Getters moving the bits of the codewords string (plus a trailing '0') to their position in
+        the binary string of both boards, most significant bit first, and the boards of the modules
+        they fill
+        """
+        placement = self._placements.get(count)
+        if placement is None:
+            layout = self.layout
+            length = self.size * self.width
+            sequence = np.arange(count)
+            getters = []
+            for lines, positions in ((layout.rows, layout.columns), (layout.columns, layout.rows)):
+                order = np.full(length, count)
+                order[lines[:count] * self.width + positions[:count]] = sequence
+                getters.append(itemgetter(*order[::-1].tolist()))
+            filled = np.zeros((self.size, self.size), dtype=np.uint8)
+            filled[layout.rows[:count], layout.columns[:count]] = 1
+            placement = self._placements.setdefault(count, (getters, self._to_boards(filled)))
+        return placement
+
+    def _get_data(self, codewords):
+        count = min(len(codewords) * 8, len(self.layout.rows))
+        bits = format(int.from_bytes(bytes(codewords), 'big'), f'0{len(codewords) * 8}b')[:count] + '0'
+        (rows_getter, columns_getter), filled = self._get_placement(count)
+        data = (int(''.join(rows_getter(bits)), 2), int(''.join(columns_getter(bits)), 2))
+        # the modules after the last codeword stay unmasked
+        return data, filled
+
+    def get_candidate(self, data, filled, formats, mask_index):
+        mask_rows, mask_columns = self.masks[mask_index]
+        format_rows, format_columns = formats[mask_index]
+        return (self.template[0] | format_rows | (data[0] ^ (mask_rows & filled[0])),
+                self.template[1] | format_columns | (data[1] ^ (mask_columns & filled[1])))
+
+    def get_optimal_mask(self, codewords, error_correction, mask_strategy, mask=None):
+        data, filled = self._get_data(codewords)
+        formats = self._get_formats(error_correction)
+        if mask_strategy == MASK_STRATEGY_FIXED:
+            return self.to_matrix(self.get_candidate(data, filled, formats, mask)[0])
+
+        candidates = [self.get_candidate(data, filled, formats, mask_index) for mask_index in range(8)]
+        if mask_strategy == MASK_STRATEGY_PRUNED and self.size < PRUNING_MAX_SIZE:
+            best_index = self.get_pruned_mask_index(candidates)
+        else:
+            scores = [self.get_penalty_score(*candidate) for candidate in candidates]
+            best_index = scores.index(min(scores))
+        return self.to_matrix(candidates[best_index][0])
+
+    def get_pruned_mask_index(self, candidates):
+        """
+        Index of the best scored candidate, the same a full evaluation would pick
+
+        Candidates are completed from the lowest balance and block penalty: the runs, then the
+        finder patterns are only scored while the candidate can still beat the best one so far.
+        The rules are summed in plain Python, NumPy calls would cost more than the scores they skip.
+        """
+        partial_scores = [self.get_balance_penalty(rows) + self.get_block_penalty(rows) for rows, _ in candidates]
+        best_index = None
+        best_score = None
+        for index in sorted(range(len(candidates)), key=partial_scores.__getitem__):
+            score = partial_scores[index]
+            for rule in (self.get_run_penalty, self.get_finder_penalty):
+                # ties go to the lowest index like in a full evaluation
+                if best_index is not None and (score, index) > (best_score, best_index):
+                    break
+                score += rule(*candidates[index])
+            else:
+                if best_index is None or (score, index) < (best_score, best_index):
+                    best_index = index
+                    best_score = score
+        return best_index
+
+    def get_penalty_score(self, rows, columns):
+        return (self.get_run_penalty(rows, columns) + self.get_block_penalty(rows) +
+                self.get_finder_penalty(rows, columns) + self.get_balance_penalty(rows))
+
+    def get_run_penalty(self, rows, columns):
+        """
+        Rule 1: 3 + (length - 5) for every run of 5 or more same colored modules in a row or column
+        """
+        penalty = 0
+        for board in (rows, columns, ~rows & self.modules, ~columns & self.modules):
+            # a run of length >= 5 holds length - 4 windows of 5 modules, plus 2 for its first window
+            fives = board & (board >> 1) & (board >> 2) & (board >> 3) & (board >> 4)
+            penalty += _popcount(fives) + 2 * _popcount(fives & ~(fives << 1))
+        return penalty
+
+    def get_block_penalty(self, rows):
+        """
+        Rule 2: 3 for every 2x2 block of same colored modules
+        """
+        horizontal = ~(rows ^ (rows >> 1))
+        vertical = ~(rows ^ (rows >> self.width))
+        return _popcount(horizontal & (horizontal >> self.width) & vertical & self.block_starts) * 3
+
+    def get_finder_penalty(self, rows, columns):
+        """
+        Rule 3: 40 for every finder-like pattern in a row or column
+        """
+        patterns = 0
+        for dark in (rows, columns):
+            light = ~dark & self.modules
+            core = (dark & (light >> 1) & (dark >> 2) & (dark >> 3) & (dark >> 4) & (light >> 5) & (dark >> 6))
+            quiet = light & (light >> 1) & (light >> 2) & (light >> 3)
+            found = (core & (quiet >> 7)) | (quiet & (core >> 4))
+            patterns += _popcount(found & self.finder_starts)
+        return patterns * 40
+
+    def get_balance_penalty(self, rows):
+        """
+        Rule 4: 10 for every 5% of dark modules away from 50%
+        """
+        percentage = _popcount(rows) * 100 / (self.size * self.size)
+        return abs(int(percentage / 5 - 10)) * 10
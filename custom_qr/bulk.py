@@ -0,0 +1,361 @@
+import csv
+import hashlib
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from multiprocessing import shared_memory
+import numpy as np
+from .constraints import ERROR_CORRECTION_LEVEL_Q, MASK_STRATEGY_FULL, ENGINE_BITBOARD
+from .custom_qr import CustomQR
+from .dataConverter import DataConverter
+from .generate_qr import GenerateQR
+from .image_writer import ImageWriter
+
+_writer = None
+
+
+def generate_bulk(payloads, version=None, error_correction=ERROR_CORRECTION_LEVEL_Q,
+                  mask_strategy=MASK_STRATEGY_FULL, mask=None, mode=None, workers=None, chunk_size=256,
+                  render=False, style=None, engine=ENGINE_BITBOARD):
+    """
+    Generate the symbols of the payloads on a process pool, returns the (matrix, version) of every
+    payload in order, or its (image, version) with render=True
+
+    The versions are chosen here, so the shape of every result is known before the workers start:
+    they write their results in a shared memory block instead of sending them back pickled, and
+    the results are copied out of it at once.
+
+    workers: processes of the pool, the CPU count by default
+    chunk_size: payloads of every task
+    style: draw_qr keyword arguments (background, block_style, finder_style, alignment_style)
+    """
+    GenerateQR.check_mask_strategy(mask_strategy, mask)
+    _check_pool(workers, chunk_size)
+    payloads = list(payloads)
+    style = dict(style or {})
+    versions = get_versions(payloads, version, error_correction, mode)
+    block_size = style.get("block_style", {}).get("size", 10) if render else 1
+    shapes = [_get_slot_shape(symbol_version, render, block_size) for symbol_version in versions]
+    ends = np.cumsum([int(np.prod(shape)) for shape in shapes], dtype=np.int64)
+    offsets = np.concatenate(([0], ends[:-1])).astype(np.int64) if len(ends) else ends
+
+    memory = shared_memory.SharedMemory(create=True, size=max(int(ends[-1]) if len(ends) else 0, 1))
+    try:
+        tasks = [(memory.name, payloads[start:start + chunk_size], versions[start:start + chunk_size],
+                  offsets[start:start + chunk_size].tolist(), error_correction, mask_strategy, mask, mode,
+                  render, style, engine)
+                 for start in range(0, len(payloads), chunk_size)]
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            for _ in executor.map(_generate_chunk, tasks):
+                pass
+        results = np.array(memory.buf[:memory.size], dtype=np.uint8)
+    finally:
+        memory.close()
+        memory.unlink()
+    return [(results[offset:offset + int(np.prod(shape))].reshape(shape), symbol_version)
+            for offset, shape, symbol_version in zip(offsets.tolist(), shapes, versions)]
+
+
+def _check_pool(workers, chunk_size, window=None):
+    if workers is not None and workers < 1:
+        raise ValueError(f"Invalid worker count: {workers}")
+    if chunk_size < 1:
+        raise ValueError(f"Invalid chunk size: {chunk_size}")
+    if window is not None and window < 1:
+        raise ValueError(f"Invalid window: {window}")
+
+
+def get_versions(payloads, version, error_correction, mode=None):
+    """
+    Version of every payload: the given one, or the lowest one holding it
+    """
+    dataConverter = DataConverter(version, error_correction, mode)
+    versions = []
+    for data in payloads:
+        if version is None:
+            symbol_version = dataConverter.get_min_version(data)
+            if symbol_version is None:
+                raise ValueError("The data is too long for every version")
+        else:
+            if not dataConverter.fits(data):
+                raise ValueError(f"The data is too long for version {version}")
+            symbol_version = version
+        versions.append(symbol_version)
+    return versions
+
+
+def _get_slot_shape(version, render, block_size):
+    size = 17 + 4 * version
+    if render:
+        return (size * block_size, size * block_size, 3)
+    return (size, size)
+
+
+def _generate_chunk(task):
+    (name, payloads, versions, offsets, error_correction, mask_strategy, mask, mode,
+     render, style, engine) = task
+    qr = GenerateQR(engine)
+    custom = CustomQR()
+    block_size = style.get("block_style", {}).get("size", 10) if render else 1
+    groups = {}
+    for index, symbol_version in enumerate(versions):
+        groups.setdefault(symbol_version, []).append(index)
+
+    memory = shared_memory.SharedMemory(name=name)
+    try:
+        for symbol_version, indices in groups.items():
+            stacks = qr.generate_many([payloads[index] for index in indices], symbol_version,
+                                      error_correction, mask_strategy, mask, mode, stack=True)
+            _, matrices = stacks[symbol_version]
+            shape = _get_slot_shape(symbol_version, render, block_size)
+            for index, matrix in zip(indices, matrices):
+                slot = np.ndarray(shape, dtype=np.uint8, buffer=memory.buf, offset=offsets[index])
+                slot[...] = custom.draw_qr(matrix, **style) if render else matrix
+                del slot
+    finally:
+        memory.close()
+    return len(payloads)
+
+
+def read_payloads(source, format=None, column="data"):
+    """
+    Rows of a CSV (with a header) or JSONL file read lazily, as dicts with the payload under
+    `column`. JSONL lines that aren't objects, and the items of an iterable that aren't dicts,
+    are the payload themselves
+
+    format: "csv" or "jsonl", from the extension of the file by default
+    """
+    if not isinstance(source, (str, os.PathLike)):
+        for item in source:
+            yield item if isinstance(item, dict) else {column: item}
+        return
+
+    if format is None:
+        format = os.path.splitext(os.fspath(source))[1].lstrip(".").lower()
+    if format == "csv":
+        with open(source, newline="", encoding="utf-8") as file:
+            yield from csv.DictReader(file)
+    elif format in ("jsonl", "ndjson"):
+        with open(source, encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    item = json.loads(line)
+                    yield item if isinstance(item, dict) else {column: item}
+    else:
+        raise ValueError(f"Invalid payload file format: {format}")
+
+
+def write_bulk(rows, filename="{index}.png", column="data", version=None, error_correction=ERROR_CORRECTION_LEVEL_Q,
+               mask_strategy=MASK_STRATEGY_FULL, mask=None, mode=None, style=None, workers=None, chunk_size=64,
+               window=None, engine=ENGINE_BITBOARD, checkpoint=None, checkpoint_interval=1000):
+    """
+    Generate, render and write the image of every row (a file path or an iterable, read with read_payloads),
+    yields the (index, path) of the rows in input order as they are written
+
+    Rows are read as the workers need them, with at most `window` chunks in flight, so memory stays
+    flat whatever the input size. The workers encode, render and write, and only send back paths.
+
+    filename: path of the image of a row, formatted with the fields of the row and its index,
+        e.g. "out/{index:07d}.png" or "out/{sku}.jpg". The extension picks the image format
+    window: chunks in flight, twice the workers by default
+    checkpoint: file recording the progress every `checkpoint_interval` rows, and when the run
+        stops. Running again with it skips the images a previous run wrote, if their hash matches
+    """
+    GenerateQR.check_mask_strategy(mask_strategy, mask)
+    _check_pool(workers, chunk_size, window)
+    rows = read_payloads(rows, column=column)
+    workers = workers or os.cpu_count()
+    window = window or 2 * workers
+    settings = (version, error_correction, mask_strategy, mask, mode, dict(style or {}), engine)
+    progress = Checkpoint(checkpoint, checkpoint_interval) if checkpoint is not None else None
+    settings_digest = hashlib.sha256(repr(settings).encode("utf-8")).digest()
+
+    rows = enumerate(rows)
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        try:
+            while True:
+                chunk = []
+                sources = []
+                for index, row in islice(rows, chunk_size):
+                    path = _get_path(filename, row, index)
+                    data = _get_payload(row, column, index)
+                    digest = None
+                    if progress is not None:
+                        sources.append(_get_source_digest(data, settings_digest))
+                        digest = progress.get_digest(index, path, sources[-1])
+                    chunk.append((index, data, path, digest))
+                if not chunk:
+                    break
+                pending.append((executor.submit(_write_chunk, chunk, settings), sources))
+                if len(pending) >= window:
+                    yield from _commit(*pending.popleft(), progress)
+            while pending:
+                yield from _commit(*pending.popleft(), progress)
+        finally:
+            # stopped early, or a chunk failed: don't start the queued chunks
+            for future, _ in pending:
+                future.cancel()
+            if progress is not None:
+                progress.close()
+
+
+def _get_path(filename, row, index):
+    try:
+        return filename.format_map({**row, "index": index})
+    except KeyError as error:
+        raise ValueError(f"row {index} has no field {error.args[0]!r}") from None
+
+
+def _get_payload(row, column, index):
+    if column not in row:
+        raise ValueError(f"row {index} has no field {column!r}")
+    data = row[column]
+    if isinstance(data, (str, bytes, bytearray, memoryview)):
+        return data
+    # JSON numbers are encoded as they are written
+    if isinstance(data, (int, float)) and not isinstance(data, bool):
+        return str(data)
+    raise ValueError(f"row {index} field {column!r} is not a string or a number")
+
+
+def _get_source_digest(data, settings_digest):
+    # hash of what the image of a row is generated from: its payload and the options of the run
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        source = b"b" + bytes(data)
+    else:
+        source = b"s" + str(data).encode("utf-8", "surrogatepass")
+    return hashlib.sha256(settings_digest + source).hexdigest()
+
+
+def _commit(future, sources, progress):
+    for position, (index, path, digest, written) in enumerate(future.result()):
+        if progress is not None:
+            progress.commit(index, path, digest, sources[position])
+        if written:
+            yield index, path
+
+
+def _write_chunk(chunk, settings):
+    version, error_correction, mask_strategy, mask, mode, style, engine = settings
+    results = []
+    missing = []
+    for index, data, path, digest in chunk:
+        # written by a previous run, still there and unchanged
+        if digest is not None and _get_file_digest(path) == digest:
+            results.append((index, path, digest, False))
+        else:
+            missing.append((len(results), data))
+            results.append(None)
+    if not missing:
+        return results
+
+    custom = CustomQR()
+    writer = _get_writer()
+    symbols = GenerateQR(engine).generate_many([data for _, data in missing], version, error_correction,
+                                               mask_strategy, mask, mode)
+    # the images are encoded and written while the next ones are rendered
+    futures = [writer.write(custom.draw_qr(matrix, **style), chunk[position][2])
+               for (position, _), (matrix, _) in zip(missing, symbols)]
+    writer.flush()
+    for (position, _), future in zip(missing, futures):
+        index, _, path, _ = chunk[position]
+        results[position] = (index, path, hashlib.sha256(future.result()).hexdigest(), True)
+    return results
+
+
+def _get_writer():
+    # image writer of the worker process
+    global _writer
+    if _writer is None:
+        _writer = ImageWriter(workers=2)
+    return _writer
+
+
+def _get_file_digest(path):
+    try:
+        with open(path, "rb") as file:
+            return hashlib.sha256(file.read()).hexdigest()
+    except OSError:
+        return None
+
+
+class Checkpoint:
+    """
+    Progress of a write_bulk run
+
+    The checkpoint file is a small JSON object replaced atomically: the rows committed, in input
+    order, and the manifest listing them. Every run writes a new manifest, a JSON line
+    [index, path, sha256, source sha256] per row, and keeps the one of the previous run to check
+    the rows it committed as it goes through them again. The source hash covers the payload and
+    the options of the run, so a row is written again when either changed.
+    """
+    def __init__(self, path, interval=1000):
+        self.path = os.fspath(path)
+        self.interval = interval
+        state = {"offset": 0, "run": 0, "manifest": None}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as file:
+                state = json.load(file)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.resume_offset = state["offset"]
+        self._previous_path = os.path.join(directory, state["manifest"]) if state["manifest"] else None
+        self._previous = open(self._previous_path, encoding="utf-8") if self._previous_path else None
+        self.run = state["run"] + 1
+        self.manifest_name = f"{os.path.basename(self.path)}.{self.run}.manifest"
+        self._manifest = open(os.path.join(directory, self.manifest_name), "w", encoding="utf-8")
+        self.offset = 0
+        self._saved_offset = 0
+
+    def get_digest(self, index, path, source):
+        """
+        Hash of the image of the row written by the previous run, None if it didn't commit it at this
+        path from the same source
+        """
+        if index >= self.resume_offset:
+            return None
+        line = self._previous.readline()
+        previous_index, previous_path, digest, previous_source = json.loads(line)
+        if previous_index != index or previous_path != path or previous_source != source:
+            return None
+        return digest
+
+    def commit(self, index, path, digest, source):
+        self._manifest.write(json.dumps([index, path, digest, source]) + "\n")
+        self.offset = index + 1
+        if self.offset - self._saved_offset >= self.interval:
+            self.save()
+
+    def save(self):
+        if self.offset < self.resume_offset:
+            # the checkpoint of the previous run still counts more rows
+            return
+        # the manifest is on disk before the checkpoint counts its rows
+        self._manifest.flush()
+        os.fsync(self._manifest.fileno())
+        temporary = self.path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump({"offset": self.offset, "run": self.run, "manifest": self.manifest_name}, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, self.path)
+        self._saved_offset = self.offset
+        if self._previous is not None:
+            # the checkpoint doesn't point to it anymore
+            self._previous.close()
+            os.remove(self._previous_path)
+            self._previous = None
+
+    def close(self):
+        """
+        Save the progress, the manifest of the previous run is kept if this one doesn't hold all its rows
+        """
+        self.save()
+        self._manifest.close()
+        if self._previous is not None:
+            self._previous.close()
@@ -0,0 +1,79 @@
+from bisect import bisect_left
+from .constraints import MODE_NUMBER, MODE_ALPHANUMERIC, MODE_BYTE, MODE_KANJI, EC_CODEWORDS
+
+# width of the character count indicator of each mode for versions 1-9, 10-26 and 27-40
+CHAR_COUNT_INDICATOR = {
+    MODE_NUMBER: [10, 12, 14],
+    MODE_ALPHANUMERIC: [9, 11, 13],
+    MODE_BYTE: [8, 16, 16],
+    MODE_KANJI: [8, 10, 12]
+}
+SEGMENT_MODES = (MODE_NUMBER, MODE_ALPHANUMERIC, MODE_BYTE, MODE_KANJI)
+
+
+def get_version_group(version):
+    # index of the character count indicator widths of the version
+    if version < 10:
+        return 0
+    elif version < 27:
+        return 1
+    return 2
+
+
+def get_data_bit_length(count, mode):
+    """
+    Length of `count` characters (bytes in byte mode) without mode and character count indicators
+    """
+    if mode == MODE_NUMBER:
+        return count // 3 * 10 + (0, 4, 7)[count % 3]
+    if mode == MODE_ALPHANUMERIC:
+        return count // 2 * 11 + count % 2 * 6
+    if mode == MODE_KANJI:
+        return count * 13
+    return count * 8
+
+
+def _get_max_count(bits, mode, count_bits):
+    # most characters whose data fits in `bits`, and whose count fits in the indicator
+    if mode == MODE_NUMBER:
+        count = bits // 10 * 3 + (0, 0, 0, 0, 1, 1, 1, 2, 2, 2)[bits % 10]
+    elif mode == MODE_ALPHANUMERIC:
+        count = bits // 11 * 2 + (bits % 11 >= 6)
+    elif mode == MODE_KANJI:
+        count = bits // 13
+    else:
+        count = bits // 8
+    return max(min(count, (1 << count_bits) - 1), 0)
+
+
+def _get_capacities():
+    capacities = {}
+    for version, tables in EC_CODEWORDS.items():
+        count_bits = {mode: widths[get_version_group(version)] for mode, widths in CHAR_COUNT_INDICATOR.items()}
+        capacities[version] = {
+            error_correction: {mode: _get_max_count(table[0] * 8 - 4 - count_bits[mode], mode, count_bits[mode])
+                               for mode in SEGMENT_MODES}
+            for error_correction, table in tables.items()
+        }
+    return capacities
+
+# CAPACITY[version][error_correction][mode]: most characters of a single segment symbol
+CAPACITY = _get_capacities()
+# capacities of every version, 1 to 40, per error correction and mode
+_VERSION_CAPACITIES = {
+    error_correction: {mode: [CAPACITY[version][error_correction][mode] for version in range(1, 41)]
+                       for mode in SEGMENT_MODES}
+    for error_correction in CAPACITY[1]
+}
+
+
+def get_capacity(version, error_correction, mode):
+    return CAPACITY[version][error_correction][mode]
+
+
+def get_min_version(count, error_correction, mode):
+    """
+    Lowest version holding `count` characters in a single segment of the mode, None if none does
+    """
+    index = bisect_left(_VERSION_CAPACITIES[error_correction][mode], count)
+    return index + 1 if index < 40 else None
@@ -0,0 +1,222 @@
+import argparse
+import os
+import sys
+import time
+from .constraints import (
+    MODE_NUMBER, MODE_ALPHANUMERIC, MODE_BYTE, MODE_KANJI, MODE_MIXED,
+    ERROR_CORRECTION_LEVEL_L, ERROR_CORRECTION_LEVEL_M, ERROR_CORRECTION_LEVEL_Q, ERROR_CORRECTION_LEVEL_H,
+    MASK_STRATEGY_FULL, MASK_STRATEGY_PRUNED, MASK_STRATEGY_FIXED, ENGINE_BITBOARD, ENGINE_NUMPY
+)
+from .custom_qr import CustomQR
+from .dataConverter import DataConverter
+from .generate_qr import GenerateQR
+from .image_writer import encode_image
+from .bulk import write_bulk
+
+ERROR_CORRECTION_LEVELS = {
+    "L": ERROR_CORRECTION_LEVEL_L,
+    "M": ERROR_CORRECTION_LEVEL_M,
+    "Q": ERROR_CORRECTION_LEVEL_Q,
+    "H": ERROR_CORRECTION_LEVEL_H
+}
+MODES = {
+    "number": MODE_NUMBER,
+    "alphanumeric": MODE_ALPHANUMERIC,
+    "byte": MODE_BYTE,
+    "kanji": MODE_KANJI,
+    "mixed": MODE_MIXED
+}
+
+
+def parse_color(value):
+    """
+    "R,G,B" or "#RRGGBB" to an (R, G, B) tuple
+    """
+    try:
+        if value.startswith("#") and len(value) == 7:
+            return tuple(int(value[index:index + 2], 16) for index in (1, 3, 5))
+        color = tuple(int(channel) for channel in value.split(","))
+    except ValueError:
+        color = ()
+    if len(color) != 3 or not all(0 <= channel <= 255 for channel in color):
+        raise argparse.ArgumentTypeError(f"Invalid color: {value}, use R,G,B or #RRGGBB")
+    return color
+
+
+def positive_int(value):
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"Invalid value: {value}, use a positive integer")
+    return number
+
+
+def non_negative_int(value):
+    try:
+        number = int(value)
+    except ValueError:
+        number = -1
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"Invalid value: {value}, use 0 or a positive integer")
+    return number
+
+
+def _add_symbol_arguments(parser):
+    parser.add_argument("--version", type=int, choices=range(1, 41), metavar="1-40",
+                        help="symbol version, by default the lowest one holding the data")
+    parser.add_argument("--ec", choices=ERROR_CORRECTION_LEVELS, default="Q", help="error correction level")
+    parser.add_argument("--mode", choices=MODES, help="encoding mode, by default the tightest single one")
+    parser.add_argument("--mask-strategy", choices=(MASK_STRATEGY_FULL, MASK_STRATEGY_PRUNED, MASK_STRATEGY_FIXED),
+                        default=MASK_STRATEGY_FULL)
+    parser.add_argument("--mask", type=int, choices=range(8), metavar="0-7", help="mask of the fixed strategy")
+    parser.add_argument("--engine", choices=(ENGINE_BITBOARD, ENGINE_NUMPY), default=ENGINE_BITBOARD)
+
+
+def _add_style_arguments(parser):
+    parser.add_argument("--block-size", type=positive_int, default=10, help="pixels per module")
+    parser.add_argument("--block-type", type=int, choices=(0, 1), default=0, help="0: square, 1: circle")
+    parser.add_argument("--color", type=parse_color, action="append",
+                        help="module color, repeat it for several colors (default 0,0,0)")
+    parser.add_argument("--background", type=parse_color, default=(255, 255, 255))
+    parser.add_argument("--finder-color", type=parse_color, help="finder pattern color")
+    parser.add_argument("--alignment-color", type=parse_color, help="alignment pattern color")
+
+
+def _get_symbol_options(args):
+    if args.mask is not None and args.mask_strategy == MASK_STRATEGY_FULL:
+        args.mask_strategy = MASK_STRATEGY_FIXED
+    mode = MODES[args.mode] if args.mode else None
+    return args.version, ERROR_CORRECTION_LEVELS[args.ec], args.mask_strategy, args.mask, mode
+
+
+def _get_style(args):
+    style = {
+        "background": args.background,
+        "block_style": {"size": args.block_size, "type": args.block_type, "color": args.color or [(0, 0, 0)]}
+    }
+    if args.finder_color:
+        style["finder_style"] = {"color": args.finder_color}
+    if args.alignment_color:
+        style["alignment_style"] = {"color": args.alignment_color}
+    return style
+
+
+def _generate(args):
+    version, error_correction, mask_strategy, mask, mode = _get_symbol_options(args)
+    qr = GenerateQR(args.engine)
+    matrix, version = qr.generate(args.data, version, error_correction, mask_strategy, mask, mode)
+    if args.output is None:
+        qr.print_qr(matrix)
+        return 0
+    encoded = encode_image(CustomQR().draw_qr(matrix, **_get_style(args)), os.path.splitext(args.output)[1])
+    with open(args.output, "wb") as file:
+        file.write(encoded)
+    print(f"{args.output}: version {version}")
+    return 0
+
+
+def _bulk(args):
+    version, error_correction, mask_strategy, mask, mode = _get_symbol_options(args)
+    filename = args.filename or "{index}." + args.format
+    filename = os.path.join(args.output_dir, filename)
+    start = time.perf_counter()
+    count = 0
+    for count, _ in enumerate(write_bulk(args.input, filename, args.column, version, error_correction, mask_strategy,
+                                         mask, mode, _get_style(args), args.workers, args.chunk_size, args.window,
+                                         args.engine, args.checkpoint, args.checkpoint_interval), 1):
+        if args.progress and count % args.progress == 0:
+            print(f"{count} written", file=sys.stderr)
+    elapsed = time.perf_counter() - start
+    print(f"{count} images written to {args.output_dir} in {elapsed:.2f}s ({count / max(elapsed, 1e-9):.0f}/s)")
+    return 0
+
+
+def _bench(args):
+    version, error_correction, mask_strategy, mask, mode = _get_symbol_options(args)
+    payloads = [args.data.format(index=index) for index in range(args.count)]
+    qr = GenerateQR(args.engine)
+    custom = CustomQR()
+    style = _get_style(args)
+    stages = []
+
+    def run(name, stage, items):
+        start = time.perf_counter()
+        results = [stage(item) for item in items]
+        stages.append((name, time.perf_counter() - start))
+        return results
+
+    def encode(data):
+        dataConverter = DataConverter(version, error_correction, mode)
+        return dataConverter.encode(data), dataConverter.version
+
+    encoded = run("encode", encode, payloads)
+    codewords = run("error correction", lambda item: (qr.get_codewords(item[0], item[1], error_correction), item[1]),
+                    encoded)
+    matrices = run("mask", lambda item: qr.get_optimal_mask(item[0], item[1], error_correction, mask_strategy, mask),
+                   codewords)
+    images = run("render", lambda matrix: custom.draw_qr(matrix, **style), matrices)
+    run(f"{args.format} encode", lambda img: encode_image(img, "." + args.format), images)
+
+    versions = sorted({item[1] for item in encoded})
+    print(f"{args.count} symbols, version {versions[0]}-{versions[-1]}, error correction {args.ec}, "
+          f"mask {mask_strategy}, engine {args.engine}, block size {args.block_size}")
+    total = sum(elapsed for _, elapsed in stages)
+    for name, elapsed in stages + [("total", total)]:
+        print(f"{name:>18}: {elapsed / args.count * 1e6:10.1f} us/symbol {args.count / max(elapsed, 1e-9):10.0f} symbols/s")
+    return 0
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(prog="custom-qr", description="Generate and customize QR codes")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate = subparsers.add_parser("generate", help="generate one symbol")
+    generate.add_argument("data")
+    generate.add_argument("-o", "--output", help="image file, the extension picks the format; "
+                                                 "printed on the console by default")
+    _add_symbol_arguments(generate)
+    _add_style_arguments(generate)
+    generate.set_defaults(handler=_generate)
+
+    bulk = subparsers.add_parser("bulk", help="write the images of the payloads of a CSV or JSONL file")
+    bulk.add_argument("input", help="CSV file with a header, or JSONL file")
+    bulk.add_argument("-o", "--output-dir", default=".")
+    bulk.add_argument("--filename", help="file name formatted with the fields of the row and its index, "
+                                         "{index}.FORMAT by default")
+    bulk.add_argument("--column", default="data", help="field of the payload")
+    bulk.add_argument("--format", default="png", help="image format of the default file name")
+    bulk.add_argument("--workers", type=positive_int, help="worker processes, the CPU count by default")
+    bulk.add_argument("--chunk-size", type=positive_int, default=64, help="rows of every worker task")
+    bulk.add_argument("--window", type=positive_int, help="tasks in flight, twice the workers by default")
+    bulk.add_argument("--progress", type=non_negative_int, default=0, metavar="N", help="report every N images")
+    bulk.add_argument("--checkpoint", help="progress file, running again with it skips the images already written")
+    bulk.add_argument("--checkpoint-interval", type=positive_int, default=1000, metavar="N",
+                      help="rows between checkpoints")
+    _add_symbol_arguments(bulk)
+    _add_style_arguments(bulk)
+    bulk.set_defaults(handler=_bulk)
+
+    bench = subparsers.add_parser("bench", help="measure the throughput of every stage")
+    bench.add_argument("--count", type=positive_int, default=1000, help="symbols")
+    bench.add_argument("--data", default="https://example.com/items/{index}",
+                       help="payload, formatted with the index of the symbol")
+    bench.add_argument("--format", default="png", help="image format")
+    _add_symbol_arguments(bench)
+    _add_style_arguments(bench)
+    bench.set_defaults(handler=_bench)
+    return parser
+
+
+def main(argv=None):
+    args = get_parser().parse_args(argv)
+    try:
+        return args.handler(args)
+    except (ValueError, OSError) as error:
+        print(f"custom-qr: error: {error}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
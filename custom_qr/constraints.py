@@ -4,6 +4,13 @@ MODE_BYTE = 4
 MODE_KANJI = 8
 MODE_ECI = 7
 MODE_MIXED = 0
+MODE_STRUCTURED_APPEND = 3
+
+# most symbols of a Structured Append sequence
+STRUCTURED_APPEND_SYMBOLS = 16
+
+# alphanumeric mode characters, each one is encoded by its index
+ALPHANUMERIC_CHARS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:"
 
 ERROR_CORRECTION_LEVEL_L = 1
 ERROR_CORRECTION_LEVEL_M = 2
@@ -21,6 +28,13 @@ POSITION_BOTTOM_LEFT = 3
 POSITION_BOTTOM_RIGHT = 4
 POSITION_MIDDLE = 5
 
+MASK_STRATEGY_FULL = "full"
+MASK_STRATEGY_PRUNED = "pruned"
+MASK_STRATEGY_FIXED = "fixed"
+
+ENGINE_NUMPY = "numpy"
+ENGINE_BITBOARD = "bitboard"
+
 EC_CODEWORDS = {
     1: {
         # total data codewords, ec codewords per block, number of blocks in group 1, data codewords of group 1s blocks, number of blocks in group 2, data codewords of group 2s blocks 
@@ -153,7 +167,7 @@ EC_CODEWORDS = {
         ERROR_CORRECTION_LEVEL_L: [1006, 28, 2, 111, 7, 112],
         ERROR_CORRECTION_LEVEL_M: [782, 28, 17, 46, 0, 0],
         ERROR_CORRECTION_LEVEL_Q: [568, 30, 7, 24, 16, 25],
-        ERROR_CORRECTION_LEVEL_H: [442, 30, 34, 13, 0, 0]
+        ERROR_CORRECTION_LEVEL_H: [442, 24, 34, 13, 0, 0]
     },
     23: {
         ERROR_CORRECTION_LEVEL_L: [1094, 30, 4, 121, 5, 122],
@@ -170,13 +184,13 @@ EC_CODEWORDS = {
     25: {
         ERROR_CORRECTION_LEVEL_L: [1276, 26, 8, 106, 4, 107],
         ERROR_CORRECTION_LEVEL_M: [1000, 28, 8, 47, 13, 48],
-        ERROR_CORRECTION_LEVEL_Q: [718, 30, 7, 22, 22, 23],
+        ERROR_CORRECTION_LEVEL_Q: [718, 30, 7, 24, 22, 25],
         ERROR_CORRECTION_LEVEL_H: [538, 30, 22, 15, 13, 16]
     },
     26: {
         ERROR_CORRECTION_LEVEL_L: [1370, 28, 10, 114, 2, 115],
         ERROR_CORRECTION_LEVEL_M: [1062, 28, 19, 46, 4, 47],
-        ERROR_CORRECTION_LEVEL_Q: [754, 28, 28, 23, 6, 24],
+        ERROR_CORRECTION_LEVEL_Q: [754, 28, 28, 22, 6, 23],
         ERROR_CORRECTION_LEVEL_H: [596, 30, 33, 16, 4, 17]
     },
     27: {
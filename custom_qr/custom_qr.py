@@ -10,6 +10,9 @@ class CustomQR:
     draw_qr(matrix, background, block_style, finder_style, alignment_style): 
         Draw a QR code with custom blocks, custom finder, custom alignment and custom text
     
+    draw_structured(matrices, columns, gap, background, block_style, finder_style, alignment_style):
+        Draw the symbols of a Structured Append sequence side by side, row by row
+
     write_text(img, text_style, background, block_size, text):
         Write a text on the QR code
 
@@ -55,6 +58,30 @@ class CustomQR:
 
         return img
     
+    def draw_structured(self, matrices,
+                        columns = None,
+                        gap = 4,
+                        background = (255,255,255),
+                        block_style = {"size": 10, "type" : 0, "color":[(0,0,0)]},
+                        finder_style = None,
+                        alignment_style = None):
+        # columns: symbols per row, by default a square grid; gap: modules between symbols
+        if columns is None:
+            columns = int(np.ceil(np.sqrt(len(matrices))))
+        rows = -(-len(matrices) // columns)
+        block_size = block_style["size"]
+        cell = max(len(matrix) for matrix in matrices) * block_size
+        gap = gap * block_size
+
+        img = np.full((rows * cell + (rows - 1) * gap, columns * cell + (columns - 1) * gap, 3),
+                      self._rgb_to_bgr(background), dtype=np.uint8)
+        for index, matrix in enumerate(matrices):
+            symbol = self.draw_qr(matrix, background, block_style, finder_style, alignment_style)
+            top = (index // columns) * (cell + gap)
+            left = (index % columns) * (cell + gap)
+            img[top:top + symbol.shape[0], left:left + symbol.shape[1]] = symbol
+        return img
+
     def write_text(self, img, text_style, background, block_size, text):
         if not self.check_space(img, text, block_size, text_style):
             return None # not enough space
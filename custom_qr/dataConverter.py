@@ -1,12 +1,61 @@
-from .constraints import MODE_NUMBER, MODE_ALPHANUMERIC, MODE_BYTE, MODE_KANJI, EC_CODEWORDS, ERROR_CORRECTION_LEVEL_M, ERROR_CORRECTION_LEVEL_L, ERROR_CORRECTION_LEVEL_Q, ERROR_CORRECTION_LEVEL_H
+from .constraints import MODE_NUMBER, MODE_ALPHANUMERIC, MODE_BYTE, MODE_KANJI, MODE_MIXED, MODE_STRUCTURED_APPEND, STRUCTURED_APPEND_SYMBOLS, ALPHANUMERIC_CHARS, EC_CODEWORDS, ERROR_CORRECTION_LEVEL_M, ERROR_CORRECTION_LEVEL_L, ERROR_CORRECTION_LEVEL_Q, ERROR_CORRECTION_LEVEL_H
+from .bit_buffer import BitBuffer
+from .capacity import CHAR_COUNT_INDICATOR, SEGMENT_MODES, get_version_group, get_data_bit_length, get_capacity, get_min_version
 from urllib.parse import urlparse
 import math
+import re
+import numpy as np
+
+DIGITS = b"0123456789"
+ALPHANUMERIC_BYTES = ALPHANUMERIC_CHARS.encode('ascii')
+# Shift-JIS double byte characters from 0x8140 to 0x9FFC and from 0xE040 to 0xEBBF
+KANJI_PATTERN = re.compile(rb"(?:[\x81-\x9f\xe0-\xea][\x40-\xfc]|\xeb[\x40-\xbf])*")
+
+# value of every alphanumeric character indexed by its ASCII code
+ALPHANUMERIC_TABLE = np.zeros(256, dtype=np.uint32)
+ALPHANUMERIC_TABLE[list(ALPHANUMERIC_CHARS.encode('ascii'))] = np.arange(len(ALPHANUMERIC_CHARS))
+
+# binary data is encoded as is in byte mode
+BINARY_TYPES = (bytes, bytearray, memoryview)
+
+def get_byte_view(data):
+    """
+    Flat byte view of binary data, without copy unless the buffer isn't contiguous
+    """
+    view = memoryview(data)
+    if not view.c_contiguous:
+        return memoryview(view.tobytes())
+    return view.cast('B')
+
+def _to_whole_bits(cost):
+    # round a length in sixths of bit up to a whole bit
+    if cost == math.inf:
+        return cost
+    return (cost + 5) // 6 * 6
 
 class DataConverter:        
-    def __init__(self, version = None, error_correction = ERROR_CORRECTION_LEVEL_L) -> None:
-        self._buffer = ""
+    """
+    data: str, or bytes, bytearray or memoryview encoded as is in byte mode
+    mode: None detects the tightest single mode, MODE_NUMBER, MODE_ALPHANUMERIC, MODE_BYTE or
+        MODE_KANJI forces it, MODE_MIXED splits the data in the segments giving the shortest bit stream
+    structured_append: (index, total, parity) of a symbol of a Structured Append sequence, None for
+        a standalone symbol
+    """
+    def __init__(self, version = None, error_correction = ERROR_CORRECTION_LEVEL_L, mode = None,
+                 structured_append = None) -> None:
+        if mode is not None and mode not in SEGMENT_MODES + (MODE_MIXED,):
+            raise ValueError(f"Invalid mode: {mode}")
+        if structured_append is not None:
+            index, total, parity = structured_append
+            if not (0 <= index < total <= STRUCTURED_APPEND_SYMBOLS and 0 <= parity <= 0xFF):
+                raise ValueError(f"Invalid Structured Append header: {structured_append}")
+        self._buffer = BitBuffer()
         self.version = version
         self.error_correction = error_correction
+        self.mode = mode
+        self.structured_append = structured_append
+        # mode indicator, index, total and parity
+        self._header_length = 0 if structured_append is None else 20
         self.VALUE_GEN_MAP = {
             MODE_NUMBER: self._encode_numeric,
             MODE_ALPHANUMERIC: self._encode_alphanumeric,
@@ -14,54 +63,111 @@ class DataConverter:
             MODE_KANJI: self._encode_kanji
         }
 
-    def encode(self, data: str):
-        # detect mode 
-        data, encoding_mode = self._detect_mode(data)
+    def encode(self, data):
+        return self._encode(self._get_segments_getter(data))
 
-        # encode data
-        data_generator = self.VALUE_GEN_MAP[encoding_mode]
-        data_generator(data)
+    def encode_segments(self, segments):
+        """
+        Encode (mode, encoded data) segments as they are, see _detect_mode for the encoded data of each mode
+        """
+        return self._encode(lambda version: segments)
 
+    def _encode(self, get_segments):
         # determine version if not provided and raise error if data is too long
         if self.version is None:
-            count_codewords = math.ceil(len(self._buffer) / 8)
-            for version in range(1, 41):
-                if EC_CODEWORDS[version][self.error_correction][0] >= count_codewords:
-                    self.version = version
-                    break
+            self.version = self._get_min_version(get_segments)
             if self.version is None:
                 raise ValueError("Data is too long")
         elif self.version > 40 or self.version < 1:
             raise ValueError("Invalid version number")
-        elif math.ceil(len(self._buffer) / 8) > EC_CODEWORDS[self.version][self.error_correction][0]:
+        elif not self._fits(get_segments(self.version), self.version):
             raise ValueError("Data is too long")
-               
-        # add mode indicator and character count indicator
-        CHAR_COUNT_INDICATOR = {
-            MODE_NUMBER: [10, 12, 14],
-            MODE_ALPHANUMERIC: [9, 11, 13],
-            MODE_BYTE: [8, 16, 16],
-            MODE_KANJI: [8, 10, 12]
-        }
-        if self.version < 10:
-            length_bits =  CHAR_COUNT_INDICATOR[encoding_mode][0]
-        elif self.version < 27:
-            length_bits = CHAR_COUNT_INDICATOR[encoding_mode][1]
-        else:
-            length_bits = CHAR_COUNT_INDICATOR[encoding_mode][2]
-        self._add_onhead_buffer(len(data), length_bits)
-        self._add_onhead_buffer(encoding_mode, 4)
 
-        # add terminator
-        self._add_buffer(0, 4)
+        if self.structured_append is not None:
+            index, total, parity = self.structured_append
+            self._add_buffer(MODE_STRUCTURED_APPEND, 4)
+            self._add_buffer(index, 4)
+            self._add_buffer(total - 1, 4)
+            self._add_buffer(parity, 8)
 
-        # add filler
-        byte = int(len(self._buffer) / 8)
-        for i in range(EC_CODEWORDS[self.version][self.error_correction][0] - byte):
-            self._add_buffer(0b11101100 if i % 2 == 0 else 0b00010001, 8)
+        group = get_version_group(self.version)
+        for encoding_mode, segment in get_segments(self.version):
+            # add mode indicator and character count indicator
+            self._add_buffer(encoding_mode, 4)
+            self._add_buffer(self._get_char_count(segment, encoding_mode), CHAR_COUNT_INDICATOR[encoding_mode][group])
+
+            # encode data
+            data_generator = self.VALUE_GEN_MAP[encoding_mode]
+            data_generator(segment)
 
-        return [int(self._buffer[i:i+8], 2) for i in range(0, len(self._buffer), 8)]
+        # add terminator, shortened if the data ends less than 4 bits before the capacity,
+        # the last byte is completed with zeros
+        self._add_buffer(0, min(4, EC_CODEWORDS[self.version][self.error_correction][0] * 8 - len(self._buffer)))
+        encoded_data = self._buffer.to_bytes()
+
+        # add filler
+        filler = EC_CODEWORDS[self.version][self.error_correction][0] - len(encoded_data)
+        return encoded_data + (b'\xec\x11' * ((filler + 1) // 2))[:max(filler, 0)]
     
+    def get_min_version(self, data):
+        """
+        Lowest version holding the data with the error correction level and mode, None if it's too long
+        """
+        return self._get_min_version(self._get_segments_getter(data))
+
+    def fits(self, data):
+        """
+        Whether the data fits in the version, or in any version when the version is None
+        """
+        get_segments = self._get_segments_getter(data)
+        if self.version is None:
+            return self._get_min_version(get_segments) is not None
+        if self.version > 40 or self.version < 1:
+            raise ValueError("Invalid version number")
+        return self._fits(get_segments(self.version), self.version)
+
+    def get_parity(self, data):
+        """
+        Structured Append parity of the data: XOR of the bytes of the segments it is encoded with,
+        in the mode and version of the converter
+        """
+        get_segments = self._get_segments_getter(data)
+        version = self.version or self._get_min_version(get_segments) or 40
+        parity = 0
+        for _, segment in get_segments(version):
+            parity ^= int(np.bitwise_xor.reduce(np.frombuffer(segment, dtype=np.uint8), initial=0))
+        return parity
+
+    def _get_segments_getter(self, data):
+        # function returning the (mode, encoded data) segments of a version, mixed segments
+        # depend on the version group
+        if self.mode == MODE_MIXED:
+            segments_by_group = {}
+            def get_segments(version):
+                group = get_version_group(version)
+                if group not in segments_by_group:
+                    segments_by_group[group] = self._get_mixed_segments(data, group)
+                return segments_by_group[group]
+            return get_segments
+        segments = [self._get_segment(data)]
+        return lambda version: segments
+
+    def _get_min_version(self, get_segments):
+        if self.mode != MODE_MIXED and len(get_segments(1)) == 1 and not self._header_length:
+            # a single segment: lookup in the capacity table
+            encoding_mode, segment = get_segments(1)[0]
+            return get_min_version(self._get_char_count(segment, encoding_mode), self.error_correction, encoding_mode)
+        for version in range(1, 41):
+            if self._fits(get_segments(version), version):
+                return version
+        return None
+
+    def _fits(self, segments, version):
+        if len(segments) == 1 and not self._header_length:
+            encoding_mode, segment = segments[0]
+            return self._get_char_count(segment, encoding_mode) <= get_capacity(version, self.error_correction, encoding_mode)
+        return self._header_length + self._get_bit_length(segments, version) <= EC_CODEWORDS[version][self.error_correction][0] * 8
+
     def get_total_data_codewords(self):
         return EC_CODEWORDS[self.version][self.error_correction][0]
     
@@ -75,99 +181,172 @@ class DataConverter:
         return self.version
 
     def _detect_mode(self, data):
+        """
+        Tightest mode of the data and the bytes its encoder works on: ASCII for numeric and
+        alphanumeric, Shift-JIS for kanji, Latin-1 or else UTF-8 for byte
+        """
         # check if data is url and convert to uppercase deprecated bc some scanners are case sensitive
         # if (urlparse(data).scheme in ('http', 'https') and urlparse(data).netloc != ''):
         #     data = data.upper() 
 
-        is_numeric = all(char.isdigit() for char in data)
-        is_alphanumeric = all(char in "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:" for char in data)
-        if is_numeric:
-            return data, MODE_NUMBER
-        elif is_alphanumeric:
-            return data, MODE_ALPHANUMERIC
-        elif self._is_kanji_mode(data):
-            return data, MODE_KANJI
-        else:
-            return data, MODE_BYTE
-
-    def _is_kanji_mode(self, data):
         try:
-            sjis_encoded = data.encode('shift-jis')
+            encoded_data = data.encode('latin-1')
         except UnicodeEncodeError:
-            return False
-        
-        i = 0
-        while i < len(sjis_encoded):
-            if sjis_encoded[i:i+1] == b' ':     
-                i += 1
-                continue
-            if i + 1 >= len(sjis_encoded):
-                return False
-            code = (sjis_encoded[i] << 8) + sjis_encoded[i + 1]
-            if (0x8140 <= code <= 0x9FFC) or (0xE040 <= code <= 0xEBBF):
-                i += 2
-            else:
-                return False
-        return True
+            try:
+                encoded_data = data.encode('shift-jis')
+                if KANJI_PATTERN.fullmatch(encoded_data):
+                    return encoded_data, MODE_KANJI
+            except UnicodeEncodeError:
+                pass
+            return data.encode('utf-8'), MODE_BYTE
+
+        # the characters outside of a mode are what deleting the ones of the mode leaves
+        if not encoded_data.translate(None, DIGITS):
+            return encoded_data, MODE_NUMBER
+        if not encoded_data.translate(None, ALPHANUMERIC_BYTES):
+            return encoded_data, MODE_ALPHANUMERIC
+        return encoded_data, MODE_BYTE
     
-    def _add_buffer(self, value:int, bit_length:int):
-        self._buffer += f"{value:0{bit_length}b}"
-
-    def _add_onhead_buffer(self, value:int, bit_length:int):
-        self._buffer = f"{value:0{bit_length}b}" + self._buffer
-
-    def _encode_numeric(self, data):
-        for i in range(0, len(data), 3):
-            chunk = data[i:i+3]
-            if len(chunk) == 3:
-                self._add_buffer(int(chunk), 10)
-            elif len(chunk) == 2:
-                self._add_buffer(int(chunk), 7)
-            else:
-                self._add_buffer(int(chunk), 4)
-
-    def _encode_alphanumeric(self, data):
-        ALPHANUMERIC_TABLE = {
-            '0': 0, '1': 1, '2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7, '8': 8, '9': 9,
-            'A': 10, 'B': 11, 'C': 12, 'D': 13, 'E': 14, 'F': 15, 'G': 16, 'H': 17, 'I': 18, 'J': 19,
-            'K': 20, 'L': 21, 'M': 22, 'N': 23, 'O': 24, 'P': 25, 'Q': 26, 'R': 27, 'S': 28, 'T': 29,
-            'U': 30, 'V': 31, 'W': 32, 'X': 33, 'Y': 34, 'Z': 35, ' ': 36, '$': 37, '%': 38, '*': 39,
-            '+': 40, '-': 41, '.': 42, '/': 43, ':': 44
-        }
-        for i in range(0, len(data), 2):
-            chunk = data[i:i + 2]
-            if len(chunk) == 2:
-                self._add_buffer(ALPHANUMERIC_TABLE[chunk[0]]*45 + ALPHANUMERIC_TABLE[chunk[1]], 11)
-            elif len(chunk) == 1:
-                self._add_buffer(ALPHANUMERIC_TABLE[chunk], 6)
-
-    def _encode_byte(self, data: str):
-        if self._is_latin1(data):
-            for char in data:
-                self._add_buffer(ord(char), 8)
+    def _get_segment(self, data):
+        if isinstance(data, BINARY_TYPES):
+            if self.mode not in (None, MODE_BYTE, MODE_MIXED):
+                raise ValueError(f"Binary data can't be encoded in mode {self.mode}")
+            # a flat byte view of the buffer, without copy
+            return MODE_BYTE, get_byte_view(data)
+        encoded_data, encoding_mode = self._detect_mode(data)
+        if self.mode is None or self.mode == encoding_mode:
+            return encoding_mode, encoded_data
+        # numeric data is also alphanumeric and everything can be encoded in byte mode
+        if self.mode == MODE_ALPHANUMERIC and encoding_mode == MODE_NUMBER:
+            return MODE_ALPHANUMERIC, encoded_data
+        if self.mode == MODE_BYTE:
+            return MODE_BYTE, encoded_data if encoding_mode != MODE_KANJI else data.encode('utf-8')
+        raise ValueError(f"The data can't be encoded in mode {self.mode}")
+
+    def _get_mixed_segments(self, data, group):
+        """
+        Segments minimizing the bit stream length with the character count indicators of the version
+        group: dynamic programming over the characters keeping, for every mode, the shortest
+        encoding of the prefix that ends with a segment of that mode.
+        Lengths are in sixths of bit so numeric (10 bits / 3) and alphanumeric (11 bits / 2)
+        characters have whole costs.
+        """
+        if not data:
+            # the segment the default mode gives empty data
+            return [(MODE_NUMBER, b"")]
+        kanji = not isinstance(data, BINARY_TYPES)
+        if not kanji:
+            # one character per byte, without kanji: their Shift-JIS bytes aren't the data ones
+            data = bytes(data).decode('latin-1')
+            byte_encoding = 'latin-1'
         else:
-            for byte in data.encode('utf-8'):
-                self._add_buffer(byte, 8)
+            byte_encoding = 'latin-1' if self._is_latin1(data) else 'utf-8'
+        headers = [(4 + CHAR_COUNT_INDICATOR[mode][group]) * 6 for mode in SEGMENT_MODES]
+        costs = headers
+        previous_modes = []
+        for char in data:
+            char_costs = self._get_char_costs(char, byte_encoding, kanji)
+            # a segment ends on a whole bit
+            ends = [_to_whole_bits(cost) for cost in costs]
+            new_costs = [math.inf] * 4
+            previous = [None] * 4
+            for mode, char_cost in enumerate(char_costs):
+                if char_cost is None:
+                    continue
+                best, best_previous = costs[mode], mode
+                for other, end in enumerate(ends):
+                    if other != mode and end + headers[mode] < best:
+                        best, best_previous = end + headers[mode], other
+                new_costs[mode] = best + char_cost
+                previous[mode] = best_previous
+            costs = new_costs
+            previous_modes.append(previous)
+
+        # walk back from the shortest ending
+        mode = min(range(4), key=lambda index: (_to_whole_bits(costs[index]), index))
+        char_modes = []
+        for previous in reversed(previous_modes):
+            char_modes.append(mode)
+            mode = previous[mode]
+        char_modes.reverse()
+
+        segments = []
+        start = 0
+        for end in range(1, len(data) + 1):
+            if end == len(data) or char_modes[end] != char_modes[start]:
+                encoding_mode = SEGMENT_MODES[char_modes[start]]
+                chars = data[start:end]
+                if encoding_mode == MODE_KANJI:
+                    segments.append((encoding_mode, chars.encode('shift-jis')))
+                elif encoding_mode == MODE_BYTE:
+                    segments.append((encoding_mode, chars.encode(byte_encoding)))
+                else:
+                    segments.append((encoding_mode, chars.encode('ascii')))
+                start = end
+        return segments
 
-    def _is_latin1(self, char : str) -> bool:
+    def _get_char_costs(self, char, byte_encoding, kanji=True):
+        # cost in sixths of bit of the character in each mode, None if it can't be encoded in it
+        numeric = 20 if '0' <= char <= '9' else None
+        alphanumeric = 33 if char in ALPHANUMERIC_CHARS else None
+        kanji_cost = None
+        if kanji:
+            try:
+                kanji_cost = 78 if KANJI_PATTERN.fullmatch(char.encode('shift-jis')) else None
+            except UnicodeEncodeError:
+                pass
+        return numeric, alphanumeric, 48 * len(char.encode(byte_encoding)), kanji_cost
+
+    def _is_latin1(self, data):
         try:
-            char.encode('latin-1')
+            data.encode('latin-1')
         except UnicodeEncodeError:
             return False
-        return True 
-    
-    def _encode_kanji(self, data: str):
-        for char in data:
-            sjis_encoded = char.encode('shift-jis')
-
-            siji_value = (sjis_encoded[0] << 8) + sjis_encoded[1]
-            if 0x8140 <= siji_value <= 0x9FFC:
-                msb = sjis_encoded[0] - 0x81
-                lsb = sjis_encoded[1] - 0x40
-            elif 0xE040 <= siji_value <= 0xEBBF:
-                msb = sjis_encoded[0] - 0xC1
-                lsb = sjis_encoded[1] - 0x40
-            else:
-                raise ValueError(f"Invalid Shift-JIS value: {siji_value}")
-
-            self._add_buffer((msb * 0xC0) + lsb, 13)
+        return True
+
+    def _add_buffer(self, value:int, bit_length:int):
+        self._buffer.append(value, bit_length)
+
+    def _get_bit_length(self, segments, version):
+        # length of the segments with their mode and character count indicators, without terminator
+        group = get_version_group(version)
+        return sum(4 + CHAR_COUNT_INDICATOR[encoding_mode][group] +
+                   get_data_bit_length(self._get_char_count(segment, encoding_mode), encoding_mode)
+                   for encoding_mode, segment in segments)
+
+    def _get_char_count(self, data, encoding_mode):
+        # kanji characters take 2 bytes, the other modes count bytes
+        if encoding_mode == MODE_KANJI:
+            return len(data) // 2
+        return len(data)
+
+    def _encode_numeric(self, data: bytes):
+        digits = np.frombuffer(data, dtype=np.uint8).astype(np.uint32) - ord('0')
+        full = len(digits) // 3 * 3
+        # groups of 3 digits on 10 bits, the last 1 or 2 digits on 4 or 7 bits
+        self._buffer.append_values(digits[:full].reshape(-1, 3) @ np.array([100, 10, 1], dtype=np.uint32), 10)
+        if len(digits) > full:
+            self._add_buffer(int(data[full:]), (0, 4, 7)[len(digits) - full])
+
+    def _encode_alphanumeric(self, data: bytes):
+        values = ALPHANUMERIC_TABLE[np.frombuffer(data, dtype=np.uint8)]
+        full = len(values) // 2 * 2
+        # pairs on 11 bits, a last single character on 6 bits
+        self._buffer.append_values(values[:full].reshape(-1, 2) @ np.array([45, 1], dtype=np.uint32), 11)
+        if len(values) > full:
+            self._add_buffer(int(values[-1]), 6)
+
+    def _encode_byte(self, data):
+        self._buffer.append_bytes(data)
+
+    def _encode_kanji(self, data: bytes):
+        if len(data) % 2:
+            raise ValueError("Invalid Shift-JIS value: kanji mode needs double byte characters")
+        sjis_encoded = np.frombuffer(data, dtype=np.uint8).astype(np.uint32)
+        siji_values = (sjis_encoded[0::2] << 8) | sjis_encoded[1::2]
+        low = (0x8140 <= siji_values) & (siji_values <= 0x9FFC)
+        high = (0xE040 <= siji_values) & (siji_values <= 0xEBBF)
+        if not (low | high).all():
+            raise ValueError("Invalid Shift-JIS value: kanji mode needs double byte characters")
+        siji_values -= np.where(low, 0x8140, 0xC140).astype(np.uint32)
+        self._buffer.append_values((siji_values >> 8) * 0xC0 + (siji_values & 0xFF), 13)
@@ -1,17 +1,32 @@
-class ErrorCorrection:
-    def __init__(self, ):
-        self.prim = 2
-        self.exp = 8
-        self.irreducible_poly=285
+import numpy as np
+from .constraints import EC_CODEWORDS
+
+
+class GaloisField:
+    """
+    GF(2^8) tables shared by every ErrorCorrection: LOG/EXP, the full 256x256 multiplication
+    table and, per degree, the generator polynomial and the remainder table of the RS encoder
+    """
+    def __init__(self, prim=2, exp=8, irreducible_poly=285):
+        self.prim = prim
+        self.exp = exp
+        self.irreducible_poly = irreducible_poly
         self.size = self.prim ** self.exp
         self.LOG = bytearray(self.size)
-        self.EXP = bytearray(self.size)
+        # doubled so that EXP[LOG[a] + LOG[b]] doesn't need the modulo
+        self.EXP = bytearray(2 * self.size)
         self._generate_tables()
-    
+        # MUL[a][b] = a * b
+        self.MUL = [bytes(self._mul(a, b) for b in range(self.size)) for a in range(self.size)]
+        self.MUL_TABLE = np.frombuffer(b''.join(self.MUL), dtype=np.uint8).reshape(self.size, self.size)
+        self._generator_polys = {}
+        self._remainder_tables = {}
+
     def _generate_tables(self):
         value = 1
         for i in range(self.size - 1):  # Iterate over the range of the field size
             self.EXP[i] = value
+            self.EXP[i + self.size - 1] = value
             self.LOG[value] = i
 
             # Multiply `value` by 2 in GF(2^exp) field
@@ -22,7 +37,129 @@ class ErrorCorrection:
 
         # Special case for `value = 0`
         self.LOG[0] = 0
-        self.EXP[self.size - 1] = 1  # EXP[255] = 1 for GF(2^8)
+
+    def _mul(self, a, b):
+        if a == 0 or b == 0:
+            return 0
+        return self.EXP[self.LOG[a] + self.LOG[b]]
+
+    def get_generator_poly(self, degree):
+        generator_poly = self._generator_polys.get(degree)
+        if generator_poly is None:
+            generator_poly = [1]
+            for i in range(degree):
+                # multiply by (x - 2^i)
+                factor = self.EXP[i]
+                generator_poly = [coeff ^ self.MUL[factor][previous]
+                                  for coeff, previous in zip(generator_poly + [0], [0] + generator_poly)]
+            generator_poly = self._generator_polys.setdefault(degree, tuple(generator_poly))
+        return generator_poly
+
+    def get_remainder_table(self, degree):
+        """
+        table[factor] is factor * generator_poly (without the leading 1) packed in a big-endian integer
+        """
+        table = self._remainder_tables.get(degree)
+        if table is None:
+            coeffs = self.get_generator_poly(degree)[1:]
+            table = [int.from_bytes(bytes(self.MUL[factor][coeff] for coeff in coeffs), 'big')
+                     for factor in range(self.size)]
+            table = self._remainder_tables.setdefault(degree, table)
+        return table
+
+    def get_remainder(self, data, degree):
+        """
+        Remainder of data * x^degree divided by the generator polynomial of the degree, computed
+        with a LFSR whose `degree` byte register is kept in an integer
+        """
+        table = self.get_remainder_table(degree)
+        top = 8 * (degree - 1)
+        register_mask = (1 << (8 * degree)) - 1
+        register = 0
+        for byte in data:
+            register = ((register << 8) & register_mask) ^ table[byte ^ (register >> top)]
+        return register.to_bytes(degree, 'big')
+
+    def get_remainders(self, blocks, degree):
+        """
+        Remainders of a (..., block length) array of data blocks, computed for all the blocks at
+        once: the returned array has shape (..., degree)
+        """
+        blocks = np.asarray(blocks, dtype=np.uint8)
+        leading_shape, length = blocks.shape[:-1], blocks.shape[-1]
+        # row factor is factor * generator_poly (without the leading 1)
+        products = self.MUL_TABLE[:, list(self.get_generator_poly(degree)[1:])]
+        message = np.zeros((int(np.prod(leading_shape)), length + degree), dtype=np.uint8)
+        message[:, :length] = blocks.reshape(-1, length)
+        for i in range(length):
+            # the generator is monic, so the leading coefficient is the factor of the step
+            message[:, i + 1:i + 1 + degree] ^= products[message[:, i]]
+        return message[:, length:].reshape(leading_shape + (degree,))
+
+
+GF256 = GaloisField()
+
+_BLOCK_INDICES = {}
+_INTERLEAVE_ORDERS = {}
+
+
+def get_block_indices(version, error_correction):
+    """
+    (blocks, longest block) array of the position of each data codeword of a symbol in its block.
+    The shorter blocks of group 1 start with the position `total data codewords`, that callers
+    map to a zero: leading zeros don't change the remainder, so all the blocks can be encoded together.
+    """
+    key = (version, error_correction)
+    indices = _BLOCK_INDICES.get(key)
+    if indices is None:
+        table = EC_CODEWORDS[version][error_correction]
+        longest = max(table[3], table[5])
+        indices = np.full((table[2] + table[4], longest), table[0], dtype=np.intp)
+        start = 0
+        for block in range(table[2] + table[4]):
+            block_size = table[3] if block < table[2] else table[5]
+            indices[block, longest - block_size:] = np.arange(start, start + block_size)
+            start += block_size
+        indices.setflags(write=False)
+        indices = _BLOCK_INDICES.setdefault(key, indices)
+    return indices
+
+
+def get_interleave_order(version, error_correction):
+    """
+    Position of each codeword of the symbol, in placement order, in the data codewords followed by
+    the EC codewords of every block, so that interleaving is a single take
+    """
+    key = (version, error_correction)
+    order = _INTERLEAVE_ORDERS.get(key)
+    if order is None:
+        table = EC_CODEWORDS[version][error_correction]
+        blocks = table[2] + table[4]
+        # data: column by column over the blocks, the longer group 2 blocks end with an extra column
+        data_order = np.full((blocks, max(table[3], table[5])), table[0], dtype=np.intp)
+        start = 0
+        for block in range(blocks):
+            block_size = table[3] if block < table[2] else table[5]
+            data_order[block, :block_size] = np.arange(start, start + block_size)
+            start += block_size
+        data_order = data_order.T[data_order.T != table[0]]
+        ec_order = table[0] + np.arange(blocks * table[1]).reshape(blocks, table[1]).T.ravel()
+        order = np.concatenate((data_order, ec_order))
+        order.setflags(write=False)
+        order = _INTERLEAVE_ORDERS.setdefault(key, order)
+    return order
+
+
+class ErrorCorrection:
+    def __init__(self, field=GF256):
+        self.field = field
+        self.prim = field.prim
+        self.exp = field.exp
+        self.irreducible_poly = field.irreducible_poly
+        self.size = field.size
+        self.LOG = field.LOG
+        self.EXP = field.EXP
+        self.MUL = field.MUL
 
     # in GF(2^n) the addition/sottraction is the XOR operation -> a = -a
     def add(self, a, b):
@@ -31,16 +168,14 @@ class ErrorCorrection:
         return a ^ b
     
     def mul(self,a,b):
-        if a == 0 or b == 0:
-            return 0
-        return self.EXP[(self.LOG[a] + self.LOG[b]) % 255]
+        return self.MUL[a][b]
     
     def div(self,a,b):
         if b == 0:
             raise ZeroDivisionError("Division by zero")
         if a == 0:
             return 0
-        return self.EXP[(self.LOG[a] + (255 - self.LOG[b])) % 255]
+        return self.EXP[self.LOG[a] + 255 - self.LOG[b]]
     
     def poly_mul(self, poly1, poly2):
         len1 = len(poly1)
@@ -48,33 +183,47 @@ class ErrorCorrection:
         coeffs = [0] * (len1 + len2 - 1)
         
         for i in range(len1):
+            row = self.MUL[poly1[i]]
             for j in range(len2):
-                coeffs[i + j] ^= self.mul(poly1[i], poly2[j])
+                coeffs[i + j] ^= row[poly2[j]]
 
         return coeffs
     
     def poly_rest(self, dividend, divisor):
         rest = list(dividend)
-        while len(rest) >= len(divisor):
-            if rest[0] != 0:
-                factor = self.div(rest[0], divisor[0])
-                subtr = self.poly_mul([factor] + [0] * (len(rest) - len(divisor)), divisor)
-                rest = [rest[i] ^ subtr[i] for i in range(len(rest))]
-            rest.pop(0)
-        return rest
+        if len(rest) < len(divisor):
+            return rest
+        # the leading terms are cancelled in place instead of popped
+        for i in range(len(rest) - len(divisor) + 1):
+            if rest[i] != 0:
+                row = self.MUL[self.div(rest[i], divisor[0])]
+                for j in range(len(divisor)):
+                    rest[i + j] ^= row[divisor[j]]
+        return rest[len(rest) - len(divisor) + 1:]
     
     def get_generator_poly(self, degree):
-        last_poly = [1]
-
-        for _ in range(degree):
-            last_poly = self.poly_mul(last_poly, [1, self.EXP[_]])
-
-        return last_poly
+        return list(self.field.get_generator_poly(degree))
     
     def getEDC(self, data, codewords):
         degree = codewords - len(data)
-        messagePoly = bytearray(codewords)
-        messagePoly[:len(data)] = data
-        generatorPoly = self.get_generator_poly(degree)
-        remainder = self.poly_rest(messagePoly, generatorPoly)
-        return list(remainder)
+        return list(self.field.get_remainder(data, degree))
+
+    def getEDCs(self, blocks, degree):
+        """
+        EC codewords of many same length blocks in one vectorized pass, see GaloisField.get_remainders
+        """
+        return self.field.get_remainders(blocks, degree)
+
+    def get_symbols_EDC(self, data, version, error_correction):
+        """
+        EC codewords of the data codewords of one symbol, or of a (symbols, data codewords) array
+        of same version and error correction symbols: the result has shape (..., blocks, ec codewords
+        per block), with group 1 and group 2 blocks encoded together
+        """
+        data = np.asarray(data, dtype=np.uint8)
+        indices = get_block_indices(version, error_correction)
+        # append the zero the padding positions point to
+        padded = np.zeros(data.shape[:-1] + (data.shape[-1] + 1,), dtype=np.uint8)
+        padded[..., :-1] = data
+        blocks = padded[..., indices]
+        return self.getEDCs(blocks, EC_CODEWORDS[version][error_correction][1])
@@ -1,17 +1,41 @@
 import numpy as np
-from .constraints import MODE_NUMBER, MODE_ALPHANUMERIC, MODE_BYTE, MODE_KANJI, MODE_ECI, MODE_MIXED, ERROR_CORRECTION_LEVEL_L, ERROR_CORRECTION_LEVEL_M, ERROR_CORRECTION_LEVEL_Q, ERROR_CORRECTION_LEVEL_H, EC_CODEWORDS, FONT_SIZE_LARGE_LARGE, FONT_SIZE_LARGE, FONT_SIZE_SMALL, FONT_SIZE_MEDIUM, POSITION_BOTTOM_LEFT, POSITION_BOTTOM_RIGHT, POSITION_TOP_LEFT, POSITION_TOP_RIGHT, POSITION_MIDDLE
-from .errorCorrection import ErrorCorrection
-from .dataConverter import DataConverter
+from concurrent.futures import ThreadPoolExecutor
+from .constraints import STRUCTURED_APPEND_SYMBOLS, MODE_NUMBER, MODE_ALPHANUMERIC, MODE_BYTE, MODE_KANJI, MODE_ECI, MODE_MIXED, ERROR_CORRECTION_LEVEL_L, EC_CODEWORDS, FONT_SIZE_LARGE_LARGE, FONT_SIZE_LARGE, FONT_SIZE_SMALL, FONT_SIZE_MEDIUM, POSITION_BOTTOM_LEFT, POSITION_BOTTOM_RIGHT, POSITION_TOP_LEFT, POSITION_TOP_RIGHT, POSITION_MIDDLE, MASK_STRATEGY_FULL, MASK_STRATEGY_PRUNED, MASK_STRATEGY_FIXED, ENGINE_NUMPY, ENGINE_BITBOARD
+from .errorCorrection import ErrorCorrection, get_interleave_order
+from .dataConverter import DataConverter, BINARY_TYPES, get_byte_view
+from .template import QrTemplate
+from .layout import get_layout, get_alignment_coordinates, get_version_information, FORMAT_INFORMATION
+from .penalty import get_penalty_scores, get_pruned_mask_index
+from .bitboard import get_bitboard
+
+# modules of the candidate matrices scored at once by the numpy engine
+MASK_CHUNK_MODULES = 1 << 22
 
-# TODO: cache all the module_sequence for each version
 class GenerateQR:
-    def generate(self, data, version = None, error_correction = ERROR_CORRECTION_LEVEL_L):
-        encoded_data, version = self.get_encoded_data(data, version, error_correction)
+    """
+    engine: ENGINE_BITBOARD applies masks and scores them on Python integers, ENGINE_NUMPY on
+        stacked NumPy arrays, both give the same matrices
+    """
+    def __init__(self, engine = ENGINE_BITBOARD):
+        if engine not in (ENGINE_NUMPY, ENGINE_BITBOARD):
+            raise ValueError(f"Invalid engine: {engine}")
+        self.engine = engine
+
+    def generate(self, data, version = None, error_correction = ERROR_CORRECTION_LEVEL_L,
+                 mask_strategy = MASK_STRATEGY_FULL, mask = None, mode = None, structured_append = None):
+        self.check_mask_strategy(mask_strategy, mask)
+        encoded_data, version = self.get_encoded_data(data, version, error_correction, mode, structured_append)
         codewords = self.get_codewords(encoded_data, version, error_correction)
-        module_sequence = self.get_module_sequence(codewords, version, error_correction)
-        optimanl_mask = self.get_optimal_mask(codewords ,module_sequence, version, error_correction)
+        optimanl_mask = self.get_optimal_mask(codewords, version, error_correction, mask_strategy, mask)
         return optimanl_mask, version
 
+    @staticmethod
+    def check_mask_strategy(mask_strategy, mask):
+        if mask_strategy not in (MASK_STRATEGY_FULL, MASK_STRATEGY_PRUNED, MASK_STRATEGY_FIXED):
+            raise ValueError(f"Invalid mask strategy: {mask_strategy}")
+        if mask_strategy == MASK_STRATEGY_FIXED and mask not in range(8):
+            raise ValueError("The fixed mask strategy needs a mask index between 0 and 7")
+
     def print_qr(self, matrix):
         # char_on = '█'  # Or you can use '1'
         char_on = '#'
@@ -21,297 +45,282 @@ class GenerateQR:
             print(row_str)
         print()
 
-    def get_encoded_data(self, data, version, error_correction):
-        dataConverter = DataConverter(version, error_correction)
+    def generate_structured(self, data, symbols = None, version = None, error_correction = ERROR_CORRECTION_LEVEL_L,
+                            mask_strategy = MASK_STRATEGY_FULL, mask = None, mode = None, executor = None):
+        """
+        Split the data in a Structured Append sequence of up to 16 symbols and generate them
+        concurrently, returns the (matrix, version) of every symbol in sequence order
+
+        symbols: number of symbols, by default the fewest that hold the data
+        version: version of every symbol, by default the lowest one holding each part
+        executor: concurrent.futures executor generating the symbols, a thread pool by default.
+            Its workers receive picklable arguments, so a process pool works too
+        """
+        self.check_mask_strategy(mask_strategy, mask)
+        parts = self.get_structured_parts(data, symbols, version, error_correction, mode)
+        # parity of the bytes the parts are stored with
+        parity = 0
+        for part in parts:
+            parity ^= DataConverter(version, error_correction, mode, (0, len(parts), 0)).get_parity(part)
+        tasks = [(part, version, error_correction, mask_strategy, mask, mode, (index, len(parts), parity))
+                 for index, part in enumerate(parts)]
+        if executor is None:
+            with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+                return list(executor.map(self._generate_task, tasks))
+        return list(executor.map(self._generate_task, tasks))
+
+    def _generate_task(self, task):
+        return self.generate(*task)
+
+    def get_structured_parts(self, data, symbols = None, version = None, error_correction = ERROR_CORRECTION_LEVEL_L, mode = None):
+        """
+        Split the data in parts that each fit in a Structured Append symbol of the version, or of
+        version 40 when the version is None. Parts have the same length when they can
+
+        A reader joins the bytes of the parts, so they all share the charset of the whole data:
+        text encoded in byte mode that isn't Latin-1 is split in UTF-8 bytes parts, on character
+        boundaries, instead of each part picking its own charset
+        """
+        if symbols is not None and not 1 <= symbols <= STRUCTURED_APPEND_SYMBOLS:
+            raise ValueError(f"A Structured Append sequence has 1 to {STRUCTURED_APPEND_SYMBOLS} symbols")
+        dataConverter = DataConverter(version or 40, error_correction, mode, (0, STRUCTURED_APPEND_SYMBOLS, 0))
+        if isinstance(data, BINARY_TYPES):
+            # parts are handed to the workers, they must be picklable
+            data = bytes(get_byte_view(data))
+        # start of every character, and the end of the data
+        starts = range(len(data) + 1)
+        if isinstance(data, str) and not self._is_latin1(data):
+            if mode == MODE_MIXED or dataConverter._get_segment(data)[0] == MODE_BYTE:
+                data = data.encode('utf-8')
+                starts = [index for index, byte in enumerate(data) if byte & 0xC0 != 0x80] + [len(data)]
+        length = len(starts) - 1
+        if symbols is not None and symbols > max(length, 1):
+            raise ValueError(f"{symbols} symbols would hold empty parts of {length} characters")
+
+        if symbols is None:
+            # fewest parts: the longest prefix that fits, then the longest of what's left...
+            symbols = 0
+            start = 0
+            while start < length or symbols == 0:
+                end = self._get_part_end(data, starts, start, length, dataConverter)
+                if end == start and start < length:
+                    raise ValueError("Data is too long")
+                symbols += 1
+                start = end
+            if symbols > STRUCTURED_APPEND_SYMBOLS:
+                raise ValueError("Data is too long")
+
+        # ...then the same number of parts of the same length, when they fit
+        bounds = [length * index // symbols for index in range(symbols + 1)]
+        parts = [data[starts[start]:starts[end]] for start, end in zip(bounds, bounds[1:])]
+        if all(dataConverter.fits(part) for part in parts):
+            return parts
+
+        # else the longest prefixes, leaving a character at least for each following part
+        parts = []
+        start = 0
+        for index in range(symbols):
+            end = self._get_part_end(data, starts, start, length - (symbols - 1 - index), dataConverter)
+            parts.append(data[starts[start]:starts[end]])
+            start = end
+        if start < length:
+            raise ValueError("Data is too long")
+        return parts
+
+    def _get_part_end(self, data, starts, start, end, dataConverter):
+        # end of the longest part from the character start, up to the character end, that fits:
+        # binary search as a longer part never needs less bits
+        low, high = start, end
+        while low < high:
+            middle = (low + high + 1) // 2
+            if dataConverter.fits(data[starts[start]:starts[middle]]):
+                low = middle
+            else:
+                high = middle - 1
+        return low
+
+    def _is_latin1(self, data):
+        try:
+            data.encode('latin-1')
+        except UnicodeEncodeError:
+            return False
+        return True
+
+    def get_encoded_data(self, data, version, error_correction, mode=None, structured_append=None):
+        dataConverter = DataConverter(version, error_correction, mode, structured_append)
         encoded_data = dataConverter.encode(data)
         return encoded_data, dataConverter.version
 
+    def fits(self, data, version=None, error_correction=ERROR_CORRECTION_LEVEL_L, mode=None):
+        """
+        Whether the data fits in the version, or in any version when the version is None, without encoding it
+        """
+        return DataConverter(version, error_correction, mode).fits(data)
+
+    def min_version(self, data, error_correction=ERROR_CORRECTION_LEVEL_L, mode=None):
+        """
+        Lowest version holding the data, None if it's too long for every version
+        """
+        return DataConverter(None, error_correction, mode).get_min_version(data)
+
+    def template(self, pattern, version=None, error_correction=ERROR_CORRECTION_LEVEL_L,
+                 mask_strategy=MASK_STRATEGY_FULL, mask=None):
+        """
+        Template of a pattern with one field, e.g. "https://x.io/t/{id}", whose generate(value) reuses
+        the encoding of the constant text
+        """
+        return QrTemplate(self, pattern, version, error_correction, mask_strategy, mask)
+
+    def generate_many(self, payloads, version = None, error_correction = ERROR_CORRECTION_LEVEL_L,
+                      mask_strategy = MASK_STRATEGY_FULL, mask = None, mode = None, stack = False):
+        """
+        Generate a symbol for every payload, the same ones generate gives
+
+        The payloads are grouped by version, and every group is error corrected and placed at once
+        with the tables of its version. Returns the (matrix, version) of every payload in order, or
+        with stack=True a {version: (payload indices, (n, size, size) uint8 matrices)} dict
+        """
+        self.check_mask_strategy(mask_strategy, mask)
+        groups = {}
+        for index, data in enumerate(payloads):
+            encoded_data, symbol_version = self.get_encoded_data(data, version, error_correction, mode)
+            indices, encoded = groups.setdefault(symbol_version, ([], []))
+            indices.append(index)
+            encoded.append(encoded_data)
+
+        stacks = {}
+        for symbol_version, (indices, encoded) in groups.items():
+            encoded_data = np.frombuffer(b"".join(encoded), dtype=np.uint8).reshape(len(encoded), -1)
+            codewords = self.get_many_codewords(encoded_data, symbol_version, error_correction)
+            matrices = self.get_optimal_masks(codewords, symbol_version, error_correction, mask_strategy, mask)
+            stacks[symbol_version] = (np.array(indices), matrices)
+        if stack:
+            return stacks
+
+        symbols = [None] * sum(len(indices) for indices, _ in stacks.values())
+        for symbol_version, (indices, matrices) in stacks.items():
+            for index, matrix in zip(indices.tolist(), matrices):
+                symbols[index] = (matrix, symbol_version)
+        return symbols
+
+    def get_many_codewords(self, encoded_data, version, error_correction):
+        """
+        Interleaved codewords of a (symbols, data codewords) array of same version symbols
+        """
+        ec_codewords = ErrorCorrection().get_symbols_EDC(encoded_data, version, error_correction)
+        codewords = np.concatenate((encoded_data, ec_codewords.reshape(len(encoded_data), -1)), axis=1)
+        return codewords.take(get_interleave_order(version, error_correction), axis=1)
+
     def get_codewords(self, encoded_data, version, error_correction):
-        table = EC_CODEWORDS[version][error_correction] 
-        blocks = []
-        ec_blocks = []
-        codewords = []
-
-        for i in range(table[2] + table[4]):
-            if i < table[2]:
-                block_size = table[3]
-            else:
-                block_size = table[5]
-            blocks.append(encoded_data[:block_size])
-            encoded_data = encoded_data[block_size:]
-            ec_blocks.append(ErrorCorrection().getEDC(blocks[i], block_size+table[1]))
-
-        for c in range(table[3]):
-            for j in range(table[2] + table[4]):
-                codewords.append(blocks[j][c])
-        for j in range(table[2], table[2] + table[4]):
-            codewords.append(blocks[j][table[5] - 1])
-        for c in range(table[1]):
-            for j in range(table[2]+table[4]):
-                codewords.append(ec_blocks[j][c])
-        
-        return codewords
+        table = EC_CODEWORDS[version][error_correction]
+        error_correction_code = ErrorCorrection()
+        ec_codewords = []
+        start = 0
+        for block_size in [table[3]] * table[2] + [table[5]] * table[4]:
+            ec_codewords += error_correction_code.getEDC(encoded_data[start:start + block_size], block_size + table[1])
+            start += block_size
+
+        codewords = np.array(list(encoded_data[:table[0]]) + ec_codewords, dtype=np.uint8)
+        return codewords.take(get_interleave_order(version, error_correction))
 
     def get_module_sequence(self, codewords, version, error_correction):
-        size = 17 + 4 * version
-        matrix = np.zeros((size, size), dtype=int)
-
-        self._fill_area(matrix, 0, 0, 9, 9)  # Top-left finder pattern
-        self._fill_area(matrix, 0, size - 8, 8, 9)  # Top-right finder pattern
-        self._fill_area(matrix, size - 8, 0, 9, 8)  # Bottom-left finder pattern
-
-        # Alignment patterns
-        alignment_tracks = GenerateQR.get_alignment_coordinates(version)
-        last_track = len(alignment_tracks) - 1 
-        for row_index, row in enumerate(alignment_tracks):
-            for column_index, column in enumerate(alignment_tracks):
-                if (row_index == 0 and (column_index == 0 or column_index == last_track)) or \
-                    (column_index == 0 and row_index == last_track):
-                    continue
-                self._fill_area(matrix, row - 2, column - 2, 5, 5)
-        
-        # Timing patterns
-        self._fill_area(matrix, 6, 9, version * 4, 1)  # Horizontal timing pattern
-        self._fill_area(matrix, 9, 6, 1, version * 4)  # Vertical timing pattern
-
-        # Dark module
-        matrix[size - 8, 8] = 1
-
-        # Version information
-        if version >= 7:
-            self._fill_area(matrix, 0,size - 11, 3, 6)
-            self._fill_area(matrix, size - 11, 0, 6, 3)
-
-        row_step = -1
-        row = size - 1
-        column = size - 1
-        sequence = []
-        index = 0
-
-        # elaborete the insertion sequence of the modules
-        while column >= 0:
-            if matrix[row, column] == 0:
-                sequence.append((row, column))
-            
-            if index % 2 == 1:
-                row += row_step
-                if row == -1 or row == size:
-                    row_step = -row_step
-                    row += row_step
-                    column -= 2 if column == 7 else 1
-                else:
-                    column += 1
-            else:
-                column -= 1
-            
-            index += 1
-        return sequence
+        layout = get_layout(version)
+        return list(zip(layout.rows.tolist(), layout.columns.tolist()))
 
     @staticmethod
     def get_alignment_coordinates(version):
-        if version == 1:
-            return []
-        intervals = version // 7 + 1
-        distance = 4 * version + 4
-        step = -(-distance // (intervals * 2)) * 2  
-        return [6] + [distance + 6 - (intervals - 1 - index) * step for index in range(intervals)]
-
-    def _fill_area(self, matrix ,row, column, width, height, fill=1):
-        fill_row = [fill] * width
-        matrix[row:row + height, column:column + width] = fill_row
-
-    def get_optimal_mask(self, codewords, module_sequence, version, error_correction):
-        best_matrix = None
-        best_score = float('inf')
-        for index in range(8):
-            matrix = self.get_mask_matrix(index, codewords, module_sequence, version, error_correction) 
-            penalty_score = self.get_penalty_score(matrix) 
-            if penalty_score < best_score:
-                best_score = penalty_score
-                best_matrix = matrix
-        return best_matrix
-
-    def get_mask_matrix(self, mask_index, codewords, module_sequence, version, error_correction):
-        MASK_FNS = [
-            lambda row, column: ((row + column) & 1) == 0,
-            lambda row, column: (row & 1) == 0,
-            lambda row, column: column % 3 == 0,
-            lambda row, column: (row + column) % 3 == 0,
-            lambda row, column: (((row >> 1) + column // 3) & 1) == 0,
-            lambda row, column: ((row * column) & 1) + ((row * column) % 3) == 0,
-            lambda row, column: ((((row * column) & 1) + ((row * column) % 3)) & 1) == 0,
-            lambda row, column: ((((row + column) & 1) + ((row * column) % 3)) & 1) == 0,
-        ]
-        size = version * 4 + 17
-        # apply codewords and mask
-        mask_fn = MASK_FNS[mask_index]
-        matrix = np.zeros((size, size), dtype=int)
-        for index, (row, column) in enumerate(module_sequence):
-            if index >> 3 >= len(codewords):
-                break
-            # Each codeword contains 8 modules, so shifting the index to the right by 3 gives the codeword's index
-            codeword = codewords[index >> 3]
-            bit_shift = 7 - (index & 7)
-            module_bit = (codeword >> bit_shift) & 1
-            # Apply the mask function to the module bit
-            matrix[row][column] = module_bit ^ int(mask_fn(row, column))
-
-        # calculate the format information
-        FORMAT_DIVISOR = np.array([1, 0, 1, 0, 0, 1, 1, 0, 1, 1, 1], dtype=int)
-        FORMAT_MASK = np.array([1, 0, 1, 0, 1, 0, 0, 0, 0, 0, 1, 0, 0, 1, 0], dtype=int)
-        format_poly = np.zeros(15, dtype=int)
-        if error_correction == ERROR_CORRECTION_LEVEL_L:
-            error_index = 1
-        elif error_correction == ERROR_CORRECTION_LEVEL_M:
-            error_index = 0
-        elif error_correction == ERROR_CORRECTION_LEVEL_Q:
-            error_index = 3
-        elif error_correction == ERROR_CORRECTION_LEVEL_H:
-            error_index = 2
-        format_poly[0] = error_index >> 1
-        format_poly[1] = error_index & 1
-        format_poly[2] = mask_index >> 2
-        format_poly[3] = (mask_index >> 1) & 1
-        format_poly[4] = mask_index & 1
-        rest = ErrorCorrection().poly_rest(format_poly, FORMAT_DIVISOR)
-        format_poly[5:] = rest
-        masked_format_poly = np.bitwise_xor(format_poly, FORMAT_MASK)
-        format_modules = masked_format_poly.tolist()
+        return get_alignment_coordinates(version)
+
+    def get_optimal_mask(self, codewords, version, error_correction, mask_strategy=MASK_STRATEGY_FULL, mask=None):
+        """
+        full: score all the 8 masks
+        pruned: same result as full, abandoning the masks that can't win before scoring all the rules
+        fixed: use the given mask without scoring
+        """
+        if self.engine == ENGINE_BITBOARD:
+            return get_bitboard(version).get_optimal_mask(codewords, error_correction, mask_strategy, mask)
+        if mask_strategy == MASK_STRATEGY_FIXED:
+            return self.get_mask_matrix(mask, codewords, version, error_correction)
+        matrices = self.get_mask_matrices(codewords, version, error_correction)
+        if mask_strategy == MASK_STRATEGY_PRUNED:
+            best_index = get_pruned_mask_index(matrices)
+        else:
+            best_index = np.argmin(self.get_penalty_scores(matrices))
+        return matrices[best_index].copy()
+
+    def get_optimal_masks(self, codewords, version, error_correction, mask_strategy=MASK_STRATEGY_FULL, mask=None):
+        """
+        get_optimal_mask of every row of a (symbols, codewords) array, in a (symbols, size, size) uint8 array
+
+        The fixed mask is placed on all the symbols at once. Otherwise the bitboard engine scores
+        symbol by symbol, and the numpy engine scores the 8 candidates of a chunk of symbols at once,
+        pruned picking the same masks as full.
+        """
+        if mask_strategy == MASK_STRATEGY_FIXED:
+            return self.get_mask_matrices(codewords, version, error_correction, [mask])[:, 0]
+        if self.engine == ENGINE_BITBOARD:
+            bitboard = get_bitboard(version)
+            size = get_layout(version).size
+            matrices = np.empty((len(codewords), size, size), dtype=np.uint8)
+            for index, symbol_codewords in enumerate(codewords):
+                matrices[index] = bitboard.get_optimal_mask(symbol_codewords, error_correction, mask_strategy)
+            return matrices
+
+        size = get_layout(version).size
+        chunk = max(1, MASK_CHUNK_MODULES // (8 * size * size))
+        matrices = []
+        for start in range(0, len(codewords), chunk):
+            candidates = self.get_mask_matrices(codewords[start:start + chunk], version, error_correction)
+            best_indices = np.argmin(self.get_penalty_scores(candidates), axis=1)
+            matrices.append(candidates[np.arange(len(candidates)), best_indices])
+        return np.concatenate(matrices) if matrices else np.empty((0, size, size), dtype=np.uint8)
+
+    def get_mask_matrix(self, mask_index, codewords, version, error_correction):
+        return self.get_mask_matrices(codewords, version, error_correction, [mask_index])[0]
+
+    def get_mask_matrices(self, codewords, version, error_correction, mask_indices=range(8)):
+        """
+        Return the candidate matrices of the masks stacked in a (len(mask_indices), size, size) uint8 array,
+        or in a (symbols, len(mask_indices), size, size) one for a (symbols, codewords) array
+        """
+        mask_indices = list(mask_indices)
+        layout = get_layout(version)
+        # Each codeword contains 8 modules, the modules after the last codeword stay unmasked
+        bits = np.unpackbits(np.asarray(codewords, dtype=np.uint8), axis=-1)[..., :len(layout.rows)]
+        count = bits.shape[-1]
+
+        # apply codewords and mask on top of the function patterns
+        matrices = np.broadcast_to(layout.template, bits.shape[:-1] + (len(mask_indices),) + layout.template.shape).copy()
+        matrices[..., layout.rows[:count], layout.columns[:count]] = bits[..., np.newaxis, :] ^ layout.data_masks[mask_indices, :count]
 
         # place format information
-        # Top-left
-        matrix[8, :6] = format_modules[:6]
-        matrix[8, 7:9] = format_modules[6:8]
-        matrix[8, -8:] = format_modules[7:]
-        matrix[7, 8] = format_modules[8]
-        # Bottom-left
-        for index in range(7):
-            matrix[size - index - 1, 8] = format_modules[index]
-        # Top-right
-        for index in range(6):
-            matrix[5 - index, 8] = format_modules[9 + index]
-        
-        # place fixed patterns
-        # Finder patterns
-        for row, col in [(0, 0), (size - 7, 0), (0, size - 7)]:
-            self._fill_area(matrix, row, col, 7, 7)
-            self._fill_area(matrix, row + 1, col + 1, 5, 5, fill=0)
-            self._fill_area(matrix, row + 2, col + 2, 3, 3)
-        
-        # Separators
-        self._fill_area(matrix, 7, 0, 8, 1, fill=0)
-        self._fill_area(matrix, 0, 7, 1, 7, fill=0)
-        self._fill_area(matrix, size - 8, 0, 8, 1, fill=0)
-        self._fill_area(matrix, 0, size - 8, 1, 7, fill=0)
-        self._fill_area(matrix, 7, size - 8, 8, 1, fill=0)
-        self._fill_area(matrix, size - 7, 7, 1, 7, fill=0)
-
-        # Alignment pattern
-        alignment_tracks = GenerateQR.get_alignment_coordinates(version)
-        last_track = len(alignment_tracks) - 1
-
-        for row_index, row in enumerate(alignment_tracks):
-            for column_index, column in enumerate(alignment_tracks):
-                # Skipping the alignment near the finder patterns
-                if (row_index == 0 and (column_index == 0 or column_index == last_track)) or \
-                    (column_index == 0 and row_index == last_track):
-                    continue
-                
-                # Fill a 5x5 area with `1`
-                self._fill_area(matrix, row - 2, column - 2, 5, 5)
-                # Clear a 3x3 area with `0`
-                self._fill_area(matrix, row - 1, column - 1, 3, 3, 0)
-                # Set the specific cell to `1`
-                matrix[row][column] = 1
-
-        # Timing patterns
-        for pos in range(8, size - 8, 2):
-            matrix[6, pos] = 1
-            matrix[6, pos + 1] = 0
-            matrix[pos, 6] = 1
-            matrix[pos + 1, 6] = 0
-        matrix[6, size - 7] = 1
-        matrix[size - 7, 6] = 1
-
-        # Dark module
-        matrix[size - 8, 8] = 1
-        # version information
-        if version < 7:
-            return matrix
-        version_info = self.get_version_information(version)
-        for index, bit in enumerate(version_info):
-            row = index // 3
-            col = index % 3
-            # Update matrix at specific positions
-            matrix[5 - row][size - 9 - col] = bit
-            matrix[size - 11 + col][row] = bit
-        return matrix
+        format_modules = FORMAT_INFORMATION[error_correction][mask_indices]
+        matrices[..., layout.format_rows, layout.format_columns] = format_modules[:, layout.format_bits]
+        return matrices
+
+    def get_format_information(self, mask_index, error_correction):
+        return FORMAT_INFORMATION[error_correction][mask_index].tolist()
 
     def get_version_information(self, version):
-        VERSION_DIVISOR = [1, 1, 1, 1, 1, 0, 0, 1, 0, 0, 1, 0, 1]
-        version_bin_str = format(version, '06b') + '000000000000'
-        poly = [int(b) for b in version_bin_str]
-        # Perform polynomial division
-        poly_rest_result = ErrorCorrection().poly_rest(poly, VERSION_DIVISOR)
-        return poly[:6] + poly_rest_result
+        return get_version_information(version)
+
+    @staticmethod
+    def pack_matrix(matrix):
+        """
+        Bit-packed form of a matrix, or a stack of them, for storage and transport: 8 modules per byte
+        """
+        return np.packbits(np.asarray(matrix, dtype=np.uint8), axis=-1)
+
+    @staticmethod
+    def unpack_matrix(packed):
+        """
+        Matrix, or stack of matrices, of a pack_matrix result
+        """
+        packed = np.asarray(packed, dtype=np.uint8)
+        return np.unpackbits(packed, axis=-1, count=packed.shape[-2])
 
     def get_penalty_score(self, matrix):
-        RULE_3_PATTERN = np.array([1, 0, 1, 1, 1, 0, 1, 0, 0, 0, 0], dtype=np.uint8)
-        RULE_3_REVERSED_PATTERN = RULE_3_PATTERN[::-1]
-        total_penalty = 0
-        
-        # Rule 1
-        row_penalty = sum(self.get_line_penalty(row) for row in matrix)
-        total_penalty += row_penalty
-        
-        column_penalty = sum(self.get_line_penalty(matrix[:, column_index]) for column_index in range(matrix.shape[1]))
-        total_penalty += column_penalty
-        
-        # Rule 2
-        blocks = 0
-        size = matrix.shape[0]
-        for row in range(size - 1):
-            for column in range(size - 1):
-                module = matrix[row, column]
-                if (matrix[row, column + 1] == module and
-                    matrix[row + 1, column] == module and
-                    matrix[row + 1, column + 1] == module):
-                    blocks += 1
-        total_penalty += blocks * 3
-        
-        # Rule 3
-        patterns = 0
-        for index in range(size):
-            row = matrix[index]
-            for column_index in range(size - 11):
-                if any(np.array_equal(pattern, row[column_index:column_index + 11]) for pattern in [RULE_3_PATTERN, RULE_3_REVERSED_PATTERN]):
-                    patterns += 1
-                    
-            for row_index in range(size - 11):
-                if any(np.array_equal(pattern, matrix[row_index:row_index + 11, index]) for pattern in [RULE_3_PATTERN, RULE_3_REVERSED_PATTERN]):
-                    patterns += 1
-        total_penalty += patterns * 40
-        
-        # Rule 4
-        total_modules = size * size
-        dark_modules = np.sum(matrix)
-        percentage = dark_modules * 100 / total_modules
-        mix_penalty = abs(int(percentage / 5 - 10)) * 10
-        
-        return total_penalty + mix_penalty
-
-    def get_line_penalty(self, line):
-        count = 0
-        counting = None
-        penalty = 0
-        for cell in line:
-            if cell != counting:
-                counting = cell
-                count = 1
-            else:
-                count += 1
-                if count == 5:
-                    penalty += 3
-                elif count > 5:
-                    penalty += 1
-        return penalty
\ No newline at end of file
+        return int(get_penalty_scores(matrix))
+
+    def get_penalty_scores(self, matrices):
+        return get_penalty_scores(matrices)
@@ -0,0 +1,113 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+
+
+def encode_image(img, extension=".png", params=None):
+    """
+    Bytes of the image in the format of the extension
+    """
+    try:
+        success, encoded = cv2.imencode(extension, img, params or [])
+    except cv2.error as error:
+        raise ValueError(f"Can't encode the image as {extension}") from error
+    if not success:
+        raise ValueError(f"Can't encode the image as {extension}")
+    return encoded.tobytes()
+
+
+class ImageWriter:
+    """
+    Encode and write images on a thread pool, so the next images are generated meanwhile
+    (OpenCV encoders release the GIL)
+
+    write blocks while `queue_size` images are waiting, so memory stays bounded. An encoding or
+    writing error is raised by the next write, flush or close.
+
+    with ImageWriter() as writer:
+        for ...:
+            writer.write(img, filename)
+    """
+    def __init__(self, workers=4, queue_size=None, params=None):
+        self.params = params
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._slots = threading.BoundedSemaphore(queue_size or 2 * workers)
+        self._futures = set()
+        self._lock = threading.Lock()
+        self._error = None
+        self._closed = False
+
+    def write(self, img, filename):
+        """
+        Queue the image, returns a Future of its encoded bytes
+        """
+        if self._closed:
+            raise ValueError("The writer is closed")
+        self._raise_error()
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(self._write, img, os.fspath(filename))
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def _write(self, img, filename):
+        encoded = encode_image(img, os.path.splitext(filename)[1], self.params)
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(filename, "wb") as file:
+            file.write(encoded)
+        return encoded
+
+    def _done(self, future):
+        with self._lock:
+            self._futures.discard(future)
+            if self._error is None and not future.cancelled() and future.exception() is not None:
+                self._error = future.exception()
+        self._slots.release()
+
+    def _raise_error(self):
+        with self._lock:
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def flush(self):
+        """
+        Wait for the queued images, raise the first error since the last check
+        """
+        with self._lock:
+            futures = list(self._futures)
+        for future in futures:
+            try:
+                future.result()
+            except Exception:
+                pass
+        self._raise_error()
+
+    def close(self):
+        """
+        Write the queued images and stop the threads, raise the first error since the last check
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._executor.shutdown(wait=True)
+        self._raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            # already failing: don't hide the error with a write one
+            self._closed = True
+            self._executor.shutdown(wait=True)
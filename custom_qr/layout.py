@@ -0,0 +1,229 @@
+import numpy as np
+from .constraints import ERROR_CORRECTION_LEVEL_L, ERROR_CORRECTION_LEVEL_M, ERROR_CORRECTION_LEVEL_Q, ERROR_CORRECTION_LEVEL_H
+
+FORMAT_DIVISOR = 0b10100110111
+FORMAT_MASK = 0b101010000010010
+VERSION_DIVISOR = 0b1111100100101
+ERROR_CORRECTION_BITS = {
+    ERROR_CORRECTION_LEVEL_L: 0b01,
+    ERROR_CORRECTION_LEVEL_M: 0b00,
+    ERROR_CORRECTION_LEVEL_Q: 0b11,
+    ERROR_CORRECTION_LEVEL_H: 0b10
+}
+
+
+def _get_bch_code(value, divisor):
+    # append the rest of the polynomial division over GF(2) to the value
+    degree = divisor.bit_length() - 1
+    rest = value << degree
+    for shift in range(value.bit_length() - 1, -1, -1):
+        if (rest >> (shift + degree)) & 1:
+            rest ^= divisor << shift
+    return (value << degree) | rest
+
+
+def _get_bits(value, length):
+    return [(value >> (length - 1 - index)) & 1 for index in range(length)]
+
+
+# 15 bits of format information of each error correction level and mask
+FORMAT_INFORMATION = {
+    error_correction: np.array([_get_bits(_get_bch_code((bits << 3) | mask_index, FORMAT_DIVISOR) ^ FORMAT_MASK, 15)
+                                for mask_index in range(8)], dtype=np.uint8)
+    for error_correction, bits in ERROR_CORRECTION_BITS.items()
+}
+# 18 bits of version information of the versions from 7
+VERSION_INFORMATION = {version: _get_bits(_get_bch_code(version, VERSION_DIVISOR), 18) for version in range(7, 41)}
+for _table in FORMAT_INFORMATION.values():
+    _table.setflags(write=False)
+
+_LAYOUTS = {}
+
+
+def get_layout(version):
+    """
+    Return the cached SymbolLayout of the version, building it on first use
+    """
+    layout = _LAYOUTS.get(version)
+    if layout is None:
+        layout = _LAYOUTS.setdefault(version, SymbolLayout(version))
+    return layout
+
+
+def get_alignment_coordinates(version):
+    if version == 1:
+        return []
+    intervals = version // 7 + 1
+    distance = 4 * version + 4
+    # version 32 is the only one whose spacing isn't the rounded up even one
+    step = 26 if version == 32 else -(-distance // (intervals * 2)) * 2
+    return [6] + [distance + 6 - (intervals - 1 - index) * step for index in range(intervals)]
+
+
+def get_alignment_centers(version):
+    alignment_tracks = get_alignment_coordinates(version)
+    last_track = len(alignment_tracks) - 1
+    centers = []
+    for row_index, row in enumerate(alignment_tracks):
+        for column_index, column in enumerate(alignment_tracks):
+            # Skipping the alignment near the finder patterns
+            if (row_index == 0 and (column_index == 0 or column_index == last_track)) or \
+                (column_index == 0 and row_index == last_track):
+                continue
+            centers.append((row, column))
+    return centers
+
+
+class SymbolLayout:
+    """
+    Everything of a QR symbol that depends only on its version
+
+    template: matrix with the function patterns drawn (finder, separators,
+        alignment, timing, dark module and version information)
+    reserved: boolean matrix of the modules that can't hold data
+    rows, columns: coordinates of the data modules in placement order
+    masks: boolean planes of the 8 mask patterns, shape (8, size, size)
+    data_masks: mask bits of the data modules in placement order, shape (8, n)
+    format_rows, format_columns, format_bits: coordinates of the format
+        information modules and the index of the bit placed in each of them
+    """
+    def __init__(self, version):
+        if version > 40 or version < 1:
+            raise ValueError("Invalid version number")
+        self.version = version
+        self.size = 17 + 4 * version
+        self.alignment_centers = get_alignment_centers(version)
+        self.reserved = self._get_reserved()
+        self.rows, self.columns = self._get_data_coordinates()
+        self.template = self._get_template()
+        self.masks = self._get_masks()
+        self.data_masks = self.masks[:, self.rows, self.columns]
+        self.format_rows, self.format_columns, self.format_bits = self._get_format_coordinates()
+        for array in (self.reserved, self.rows, self.columns, self.template, self.masks,
+                      self.data_masks, self.format_rows, self.format_columns, self.format_bits):
+            array.setflags(write=False)
+
+    def _get_reserved(self):
+        size = self.size
+        reserved = np.zeros((size, size), dtype=bool)
+
+        reserved[:9, :9] = True  # Top-left finder pattern
+        reserved[:9, size - 8:] = True  # Top-right finder pattern
+        reserved[size - 8:, :9] = True  # Bottom-left finder pattern
+
+        # Alignment patterns
+        for row, column in self.alignment_centers:
+            reserved[row - 2:row + 3, column - 2:column + 3] = True
+
+        # Timing patterns
+        reserved[6, 9:size - 8] = True
+        reserved[9:size - 8, 6] = True
+
+        # Version information
+        if self.version >= 7:
+            reserved[:6, size - 11:size - 8] = True
+            reserved[size - 11:size - 8, :6] = True
+        return reserved
+
+    def _get_data_coordinates(self):
+        size = self.size
+        row_step = -1
+        row = size - 1
+        column = size - 1
+        rows = []
+        columns = []
+        index = 0
+
+        # elaborete the insertion sequence of the modules
+        while column >= 0:
+            if not self.reserved[row, column]:
+                rows.append(row)
+                columns.append(column)
+
+            if index % 2 == 1:
+                row += row_step
+                if row == -1 or row == size:
+                    row_step = -row_step
+                    row += row_step
+                    column -= 2 if column == 7 else 1
+                else:
+                    column += 1
+            else:
+                column -= 1
+
+            index += 1
+        return np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp)
+
+    def _get_masks(self):
+        row, column = np.indices((self.size, self.size))
+        return np.stack([
+            ((row + column) & 1) == 0,
+            (row & 1) == 0,
+            column % 3 == 0,
+            (row + column) % 3 == 0,
+            (((row >> 1) + column // 3) & 1) == 0,
+            ((row * column) & 1) + ((row * column) % 3) == 0,
+            ((((row * column) & 1) + ((row * column) % 3)) & 1) == 0,
+            ((((row + column) & 1) + ((row * column) % 3)) & 1) == 0,
+        ])
+
+    def _get_format_coordinates(self):
+        size = self.size
+        positions = []
+        # Top-left
+        positions += [(8, column, index) for index, column in enumerate(range(6))]
+        positions += [(8, 7, 6), (8, 8, 7), (7, 8, 8)]
+        positions += [(8, size - 8 + index, 7 + index) for index in range(8)]
+        # Bottom-left
+        positions += [(size - index - 1, 8, index) for index in range(7)]
+        # Top-right
+        positions += [(5 - index, 8, 9 + index) for index in range(6)]
+        rows, columns, bits = zip(*positions)
+        return np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp), np.array(bits, dtype=np.intp)
+
+    def _get_template(self):
+        size = self.size
+        matrix = np.zeros((size, size), dtype=np.uint8)
+
+        # Finder patterns
+        for row, column in [(0, 0), (size - 7, 0), (0, size - 7)]:
+            matrix[row:row + 7, column:column + 7] = 1
+            matrix[row + 1:row + 6, column + 1:column + 6] = 0
+            matrix[row + 2:row + 5, column + 2:column + 5] = 1
+
+        # Separators
+        matrix[7, :8] = 0
+        matrix[:7, 7] = 0
+        matrix[size - 8, :8] = 0
+        matrix[:7, size - 8] = 0
+        matrix[7, size - 8:] = 0
+        matrix[size - 7:, 7] = 0
+
+        # Alignment patterns
+        for row, column in self.alignment_centers:
+            matrix[row - 2:row + 3, column - 2:column + 3] = 1
+            matrix[row - 1:row + 2, column - 1:column + 2] = 0
+            matrix[row, column] = 1
+
+        # Timing patterns
+        for pos in range(8, size - 8, 2):
+            matrix[6, pos] = 1
+            matrix[6, pos + 1] = 0
+            matrix[pos, 6] = 1
+            matrix[pos + 1, 6] = 0
+        matrix[6, size - 7] = 1
+        matrix[size - 7, 6] = 1
+
+        # Dark module
+        matrix[size - 8, 8] = 1
+
+        # Version information
+        if self.version >= 7:
+            version_info = np.array(VERSION_INFORMATION[self.version], dtype=np.uint8).reshape(6, 3)
+            matrix[5::-1, size - 9:size - 12:-1] = version_info
+            matrix[size - 11:size - 8, :6] = version_info.T
+        return matrix
+
+
+def get_version_information(version):
+    return list(VERSION_INFORMATION[version])
@@ -0,0 +1,139 @@
+import numpy as np
+
+# smallest symbol (version 20) where skipping rules saves more than the extra passes over the
+# remaining candidates cost, below it the full evaluation is faster
+PRUNING_MIN_SIZE = 97
+
+
+def _as_stack(matrices):
+    matrices = np.asarray(matrices)
+    return matrices.reshape((-1,) + matrices.shape[-2:])
+
+
+def _as_dark(matrices):
+    # 0/1 uint8 matrices are reinterpreted as bool without a copy
+    if matrices.dtype == np.uint8:
+        return matrices.view(bool)
+    return matrices != 0
+
+
+def get_penalty_scores(matrices):
+    """
+    Score a (size, size) matrix or a stack of them with the 4 penalty rules of the mask evaluation
+    """
+    matrices = np.asarray(matrices)
+    stack = _as_stack(matrices)
+    scores = (get_run_penalties(stack) + get_block_penalties(stack) +
+              get_finder_penalties(stack) + get_balance_penalties(stack))
+    return scores.reshape(matrices.shape[:-2])
+
+
+def get_pruned_mask_index(matrices):
+    """
+    Index of the best scored matrix of the stack, the same a full evaluation would pick,
+    skipping the rules of the candidates that can't win anymore. Balance and blocks seldom rule a
+    candidate out, so symbols below PRUNING_MIN_SIZE are scored in full at once
+    """
+    matrices = _as_stack(matrices)
+    if matrices.shape[-1] < PRUNING_MIN_SIZE:
+        return int(np.argmin(get_penalty_scores(matrices)))
+    partial_scores = get_balance_penalties(matrices) + get_block_penalties(matrices)
+    stages = [
+        lambda indices: get_run_penalties(matrices[indices]),
+        lambda indices: get_finder_penalties(matrices[indices]),
+    ]
+    return select_mask(partial_scores, stages)
+
+
+def select_mask(partial_scores, stages):
+    """
+    Branch and bound over the mask candidates
+
+    partial_scores: penalty of each candidate from the cheap rules
+    stages: functions returning the penalties of one of the remaining rules for an array of
+        candidate indices, from the cheapest to the most expensive
+
+    The candidate with the lowest partial score is completed first, then every stage is only
+    computed for the candidates whose partial score can still beat it.
+    Ties go to the lowest index like in a full evaluation.
+    """
+    scores = np.array(partial_scores, dtype=np.int64)
+    indices = np.arange(len(scores))
+    best_index = int(np.argmin(scores))
+    best_score = int(scores[best_index]) + sum(int(stage(indices[best_index:best_index + 1])[0]) for stage in stages)
+
+    alive = indices[indices != best_index]
+    for stage in stages:
+        alive = alive[(scores[alive] < best_score) | ((scores[alive] == best_score) & (alive < best_index))]
+        if alive.size == 0:
+            return best_index
+        scores[alive] += stage(alive)
+
+    for index in alive.tolist():
+        if scores[index] < best_score or (scores[index] == best_score and index < best_index):
+            best_index = index
+            best_score = int(scores[index])
+    return best_index
+
+
+def get_run_penalties(matrices):
+    """
+    Rule 1: 3 + (length - 5) for every run of 5 or more same colored modules in a row or column
+    """
+    matrices = _as_stack(matrices)
+    return _count_run_penalties(matrices) + _count_run_penalties(matrices.transpose(0, 2, 1))
+
+
+def _count_run_penalties(matrices):
+    # a run of length >= 5 holds length - 4 windows of 5 same colored modules, plus 2 for its first window
+    same = matrices[..., 1:] == matrices[..., :-1]
+    fives = same[..., :-3] & same[..., 1:-2] & same[..., 2:-1] & same[..., 3:]
+    runs = np.count_nonzero(fives[..., 0], axis=1) + np.count_nonzero(fives[..., 1:] & ~fives[..., :-1], axis=(1, 2))
+    return np.count_nonzero(fives, axis=(1, 2)).astype(np.int64) + runs * 2
+
+
+def get_block_penalties(matrices):
+    """
+    Rule 2: 3 for every 2x2 block of same colored modules
+    """
+    matrices = _as_stack(matrices)
+    module = matrices[:, :-1, :-1]
+    blocks = ((module == matrices[:, 1:, :-1]) &
+              (module == matrices[:, :-1, 1:]) &
+              (module == matrices[:, 1:, 1:]))
+    return np.count_nonzero(blocks, axis=(1, 2)).astype(np.int64) * 3
+
+
+def get_finder_penalties(matrices):
+    """
+    Rule 3: 40 for every finder-like pattern in a row or column
+    """
+    dark = _as_dark(_as_stack(matrices))
+    patterns = _count_finder_patterns(dark) + _count_finder_patterns(dark.transpose(0, 2, 1))
+    return patterns * 40
+
+
+def _count_finder_patterns(dark):
+    # windows start from 0 to size - 12, as in the original module by module scan
+    size = dark.shape[-1]
+    width = size - 11
+    light = ~dark
+    # dark, light, dark, dark, dark, light, dark starting at each module
+    core = (dark[..., :size - 6] & light[..., 1:size - 5] & dark[..., 2:size - 4] & dark[..., 3:size - 3] &
+            dark[..., 4:size - 2] & light[..., 5:size - 1] & dark[..., 6:])
+    # 4 light modules starting at each module
+    quiet = light[..., :size - 3] & light[..., 1:size - 2] & light[..., 2:size - 1] & light[..., 3:]
+    found = core[..., :width] & quiet[..., 7:7 + width]
+    found |= quiet[..., :width] & core[..., 4:4 + width]
+    return np.count_nonzero(found, axis=(1, 2)).astype(np.int64)
+
+
+def get_balance_penalties(matrices):
+    """
+    Rule 4: 10 for every 5% of dark modules away from 50%
+    """
+    matrices = _as_stack(matrices)
+    total_modules = matrices.shape[-1] * matrices.shape[-2]
+    dark_modules = matrices.sum(axis=(1, 2), dtype=np.int64)
+    percentage = dark_modules * 100 / total_modules
+    return np.abs(np.trunc(percentage / 5 - 10)).astype(np.int64) * 10
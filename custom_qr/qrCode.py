@@ -1,19 +1,59 @@
 from .custom_qr import CustomQR
 from .generate_qr import GenerateQR
-from .constraints import ERROR_CORRECTION_LEVEL_H, ERROR_CORRECTION_LEVEL_Q, ERROR_CORRECTION_LEVEL_M, ERROR_CORRECTION_LEVEL_L
+from .bulk import generate_bulk, write_bulk
+from .image_writer import ImageWriter, encode_image
+from .constraints import ERROR_CORRECTION_LEVEL_H, ERROR_CORRECTION_LEVEL_Q, ERROR_CORRECTION_LEVEL_M, ERROR_CORRECTION_LEVEL_L, MASK_STRATEGY_FULL, ENGINE_BITBOARD
 import cv2
 
 class QrCode:
     """
     QrCode class to generate and print QR code
     """	
-    def __init__(self):
-        self.qr = GenerateQR()
+    def __init__(self, engine=ENGINE_BITBOARD):
+        self.qr = GenerateQR(engine)
         self.custom = CustomQR()
     
-    def generate(self, data, version=None, error_correction=ERROR_CORRECTION_LEVEL_Q):
-        return self.qr.generate(data, version, error_correction)
+    def generate(self, data, version=None, error_correction=ERROR_CORRECTION_LEVEL_Q,
+                 mask_strategy=MASK_STRATEGY_FULL, mask=None, mode=None):
+        return self.qr.generate(data, version, error_correction, mask_strategy, mask, mode)
     
+    def generate_structured(self, data, symbols=None, version=None, error_correction=ERROR_CORRECTION_LEVEL_Q,
+                            mask_strategy=MASK_STRATEGY_FULL, mask=None, mode=None, executor=None):
+        return self.qr.generate_structured(data, symbols, version, error_correction, mask_strategy, mask, mode, executor)
+
+    def create_structured_image(self, matrices, columns=None, gap=4,
+                                background=(255,255,255),
+                                block_style={"size": 10, "type" : 0, "color":[(0,0,0)]},
+                                finder_style=None,
+                                alignment_style=None):
+        return self.custom.draw_structured(matrices, columns, gap, background, block_style, finder_style, alignment_style)
+
+    def fits(self, data, version=None, error_correction=ERROR_CORRECTION_LEVEL_Q, mode=None):
+        return self.qr.fits(data, version, error_correction, mode)
+
+    def min_version(self, data, error_correction=ERROR_CORRECTION_LEVEL_Q, mode=None):
+        return self.qr.min_version(data, error_correction, mode)
+
+    def generate_many(self, payloads, version=None, error_correction=ERROR_CORRECTION_LEVEL_Q,
+                      mask_strategy=MASK_STRATEGY_FULL, mask=None, mode=None, stack=False):
+        return self.qr.generate_many(payloads, version, error_correction, mask_strategy, mask, mode, stack)
+
+    def generate_bulk(self, payloads, version=None, error_correction=ERROR_CORRECTION_LEVEL_Q,
+                      mask_strategy=MASK_STRATEGY_FULL, mask=None, mode=None, workers=None, chunk_size=256,
+                      render=False, style=None):
+        return generate_bulk(payloads, version, error_correction, mask_strategy, mask, mode, workers, chunk_size,
+                             render, style, self.qr.engine)
+
+    def write_bulk(self, rows, filename="{index}.png", column="data", version=None,
+                   error_correction=ERROR_CORRECTION_LEVEL_Q, mask_strategy=MASK_STRATEGY_FULL, mask=None, mode=None,
+                   style=None, workers=None, chunk_size=64, window=None, checkpoint=None, checkpoint_interval=1000):
+        return write_bulk(rows, filename, column, version, error_correction, mask_strategy, mask, mode, style,
+                          workers, chunk_size, window, self.qr.engine, checkpoint, checkpoint_interval)
+
+    def template(self, pattern, version=None, error_correction=ERROR_CORRECTION_LEVEL_Q,
+                 mask_strategy=MASK_STRATEGY_FULL, mask=None):
+        return self.qr.template(pattern, version, error_correction, mask_strategy, mask)
+
     def create_qr_image(self, matrix, 
                         background=(255,255,255), 
                         block_style={"size": 10, "type" : 0, "color":[(0,0,0)]}, 
@@ -21,6 +61,12 @@ class QrCode:
                         alignment_style = None):
         return self.custom.draw_qr(matrix, background, block_style, finder_style, alignment_style)
     
+    def pack_matrix(self, matrix):
+        return self.qr.pack_matrix(matrix)
+
+    def unpack_matrix(self, packed):
+        return self.qr.unpack_matrix(packed)
+
     def print_qr_console(self, matrix):
         self.qr.print_qr(matrix)
 
@@ -31,6 +77,12 @@ class QrCode:
 
     def create_image_file(self, img, filename="qr.png"):
         cv2.imwrite(filename, img)
+
+    def encode_png(self, img):
+        return encode_image(img, ".png")
+
+    def image_writer(self, workers=4, queue_size=None):
+        return ImageWriter(workers, queue_size)
     
     def write_text(self, img, text, 
                     text_style={"color":(0,0,0), "size": "small", "bot": 0, "left": 0, "orientation": 0}, 
@@ -0,0 +1,155 @@
+from string import Formatter
+import numpy as np
+from .capacity import CHAR_COUNT_INDICATOR, get_version_group, get_data_bit_length
+from .constraints import (
+    MODE_NUMBER, MODE_ALPHANUMERIC, MODE_BYTE, MODE_KANJI, EC_CODEWORDS, ERROR_CORRECTION_LEVEL_L,
+    MASK_STRATEGY_FULL, MASK_STRATEGY_FIXED
+)
+from .dataConverter import DataConverter
+from .errorCorrection import ErrorCorrection, GF256, get_interleave_order
+from .layout import get_layout
+
+# characters of each mode whose encoding is only zero bits
+ZERO_CHARS = {MODE_NUMBER: b"0", MODE_ALPHANUMERIC: b"0", MODE_BYTE: b"\x00", MODE_KANJI: b"\x81\x40"}
+
+
+class QrTemplate:
+    """
+    Symbols of a pattern with one variable field, e.g. "https://x.io/t/{id}"
+
+    RS encoding is linear: the codewords of a value are the ones of a frame, where the value is
+    encoded as zero bits, XOR the codewords of the value alone. A frame is built once per mode and
+    length of the value, with the EC contribution of every byte value at each data codeword the
+    value can change, so a new value only encodes itself and looks up its EC codewords.
+    """
+    def __init__(self, generator, pattern, version=None, error_correction=ERROR_CORRECTION_LEVEL_L,
+                 mask_strategy=MASK_STRATEGY_FULL, mask=None):
+        generator.check_mask_strategy(mask_strategy, mask)
+        parts = list(Formatter().parse(pattern))
+        fields = [index for index, (_, field_name, _, _) in enumerate(parts) if field_name is not None]
+        if len(fields) != 1:
+            raise ValueError(f"The pattern needs exactly one field: {pattern}")
+        self.prefix = ''.join(literal for literal, _, _, _ in parts[:fields[0] + 1])
+        self.suffix = ''.join(literal for literal, _, _, _ in parts[fields[0] + 1:])
+        self.generator = generator
+        self.version = version
+        self.error_correction = error_correction
+        self.mask_strategy = mask_strategy
+        self.mask = mask
+        self._prefix_segments = [DataConverter()._get_segment(self.prefix)] if self.prefix else []
+        self._suffix_segments = [DataConverter()._get_segment(self.suffix)] if self.suffix else []
+        self._frames = {}
+
+    def generate(self, value):
+        """
+        Matrix and version of the pattern with the value in its field
+        """
+        encoding_mode, data = DataConverter()._get_segment(str(value))
+        frame = self._get_frame(encoding_mode, len(data))
+        if not frame.value_length:
+            return frame.get_matrix(frame.codewords), frame.version
+
+        # bits of the value alone, at their position in the changed codewords
+        dataConverter = DataConverter()
+        dataConverter.VALUE_GEN_MAP[encoding_mode](data)
+        value_bits = dataConverter._buffer.to_bytes()
+        value_bits = int.from_bytes(value_bits, 'big') >> (len(value_bits) * 8 - frame.value_length)
+        value_bits <<= len(frame.positions) * 8 - frame.offset % 8 - frame.value_length
+        delta = np.frombuffer(value_bits.to_bytes(len(frame.positions), 'big'), dtype=np.uint8)
+
+        # EC codewords of the value alone, per changed block
+        ec_delta = np.bitwise_xor.reduceat(frame.ec_tables[frame.table_indices, delta], frame.block_starts, axis=0)
+        changes = np.concatenate((delta, ec_delta.ravel()))
+        return frame.get_matrix(changes), frame.version
+
+    def _get_frame(self, encoding_mode, length):
+        frame = self._frames.get((encoding_mode, length))
+        if frame is None:
+            zero_value = ZERO_CHARS[encoding_mode] * (length // len(ZERO_CHARS[encoding_mode]))
+            frame = _Frame(self, encoding_mode, zero_value)
+            frame = self._frames.setdefault((encoding_mode, length), frame)
+        return frame
+
+
+class _Frame:
+    """
+    Codewords and matrix of a template with a zero value of a mode and length, and what changes
+    with the value: the data codewords it spans and the EC codewords of their blocks
+    """
+    def __init__(self, template, encoding_mode, zero_value):
+        dataConverter = DataConverter(template.version, template.error_correction)
+        segments = template._prefix_segments + [(encoding_mode, zero_value)] + template._suffix_segments
+        encoded_data = np.frombuffer(dataConverter.encode_segments(segments), dtype=np.uint8)
+        self.version = version = dataConverter.version
+        self.error_correction = error_correction = template.error_correction
+        self.generator = template.generator
+        self.mask_strategy = template.mask_strategy
+        self.mask = template.mask
+        table = EC_CODEWORDS[version][error_correction]
+
+        # data then EC codewords of every block, and the placement order of that buffer
+        ec_blocks = ErrorCorrection().get_symbols_EDC(encoded_data, version, error_correction)
+        self.buffer = np.concatenate((encoded_data, ec_blocks.ravel()))
+        self.order = get_interleave_order(version, error_correction)
+        self.codewords = self.buffer.take(self.order)
+
+        # position of the value bits
+        count = dataConverter._get_char_count(zero_value, encoding_mode)
+        self.offset = (dataConverter._get_bit_length(template._prefix_segments, version) + 4 +
+                       CHAR_COUNT_INDICATOR[encoding_mode][get_version_group(version)])
+        self.value_length = get_data_bit_length(count, encoding_mode)
+        first = self.offset // 8
+        last = (self.offset + max(self.value_length, 1) - 1) // 8
+        changed = np.arange(first, last + 1)
+
+        # block and position in the block of every changed data codeword
+        block_sizes = np.array([table[3]] * table[2] + [table[5]] * table[4])
+        block_ends = np.cumsum(block_sizes)
+        changed_blocks = np.searchsorted(block_ends, changed, side='right')
+        block_positions = changed - (block_ends - block_sizes)[changed_blocks]
+
+        # EC codewords of a 1 at each changed position (shorter group 1 blocks lead with a zero),
+        # then of every byte value there
+        longest = max(table[3], table[5])
+        units = np.zeros((len(changed), longest), dtype=np.uint8)
+        units[np.arange(len(changed)), longest - block_sizes[changed_blocks] + block_positions] = 1
+        unit_ec = GF256.get_remainders(units, table[1])
+        self.ec_tables = GF256.MUL_TABLE[:, unit_ec].transpose(1, 0, 2)
+        self.table_indices = np.arange(len(changed))
+        self.block_starts = np.flatnonzero(np.diff(changed_blocks, prepend=-1))
+
+        # buffer positions of the changes: the data codewords, then the EC codewords of their blocks
+        ec_positions = table[0] + np.unique(changed_blocks)[:, np.newaxis] * table[1] + np.arange(table[1])
+        self.positions = changed
+        self.changed = np.concatenate((changed, ec_positions.ravel()))
+
+        if self.mask_strategy == MASK_STRATEGY_FIXED:
+            # module of every bit of the changed codewords, in the fixed mask matrix of the frame
+            layout = get_layout(version)
+            placement = np.argsort(self.order)[self.changed]
+            modules = placement[:, np.newaxis] * 8 + np.arange(8)
+            self._bits = modules < len(layout.rows)
+            modules = modules[self._bits]
+            self._rows = layout.rows[modules]
+            self._columns = layout.columns[modules]
+            self.matrix = self.generator.get_optimal_mask(self.codewords, version, error_correction, MASK_STRATEGY_FIXED, self.mask)
+
+    def get_matrix(self, changes):
+        """
+        Matrix of the frame with `changes` XOR-ed on its changed codewords, or of the frame
+        codewords when changes is the codewords array itself
+        """
+        if changes is self.codewords:
+            if self.mask_strategy == MASK_STRATEGY_FIXED:
+                return self.matrix.copy()
+            return self.generator.get_optimal_mask(self.codewords, self.version, self.error_correction, self.mask_strategy, self.mask)
+
+        if self.mask_strategy == MASK_STRATEGY_FIXED:
+            # data bits are XOR-ed with the mask, so the changed bits flip the masked modules
+            matrix = self.matrix.copy()
+            matrix[self._rows, self._columns] ^= np.unpackbits(changes[:, np.newaxis], axis=1)[self._bits]
+            return matrix
+        buffer = self.buffer.copy()
+        buffer[self.changed] ^= changes
+        codewords = buffer.take(self.order)
+        return self.generator.get_optimal_mask(codewords, self.version, self.error_correction, self.mask_strategy, self.mask)
@@ -11,6 +11,9 @@ setup(
     url='https://github.com/DaYe03/custom_qr.git',
     packages=find_packages(),
     install_requires=['numpy', 'opencv-python'],
+    entry_points={
+        'console_scripts': ['custom-qr=custom_qr.cli:main'],
+    },
     classifiers=[
         'Programming Language :: Python :: 3',
         'License :: OSI Approved :: MIT License',
@@ -0,0 +1,90 @@
+import unittest
+import asyncio
+import threading
+import time
+import numpy as np
+from custom_qr import AsyncQrCode, QrCode
+
+class TestAsyncQrCode(unittest.TestCase):
+    def test_same_results(self):
+        """The async calls give the QrCode results."""
+        qr = QrCode()
+
+        async def run():
+            async with AsyncQrCode() as async_qr:
+                matrix, version = await async_qr.agenerate("https://example.com")
+                img = await async_qr.arender(matrix, block_style={"size": 3, "type": 1, "color": [(0, 0, 0)]})
+                png = await async_qr.aencode_png(img)
+            return matrix, version, img, png
+
+        matrix, version, img, png = asyncio.run(run())
+        expected, expected_version = qr.generate("https://example.com")
+        self.assertEqual(version, expected_version)
+        np.testing.assert_array_equal(matrix, expected)
+        np.testing.assert_array_equal(img, qr.create_qr_image(expected, block_style={"size": 3, "type": 1, "color": [(0, 0, 0)]}))
+        self.assertEqual(png, qr.encode_png(img))
+
+    def test_concurrency_limit(self):
+        """No more than max_concurrency calls run at once, and the loop stays responsive."""
+        async_qr = AsyncQrCode(max_concurrency=2)
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def slow_generate(*args):
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.02)
+            with lock:
+                running.pop()
+            return "done"
+
+        async_qr.qr.generate = slow_generate
+
+        async def run():
+            ticks = 0
+            tasks = [asyncio.ensure_future(async_qr.agenerate("x")) for _ in range(6)]
+            while not all(task.done() for task in tasks):
+                ticks += 1
+                await asyncio.sleep(0.001)
+            return [task.result() for task in tasks], ticks
+
+        results, ticks = asyncio.run(run())
+        async_qr.close()
+        self.assertEqual(results, ["done"] * 6)
+        self.assertEqual(max(peak), 2)
+        self.assertGreater(ticks, 5)
+
+    def test_cancel(self):
+        """A cancelled call that hasn't started never runs, and errors reach the caller."""
+        async_qr = AsyncQrCode(max_concurrency=1)
+        started = []
+        release = threading.Event()
+
+        def blocking_generate(data, *args):
+            started.append(data)
+            release.wait(1)
+            return data
+
+        async_qr.qr.generate = blocking_generate
+
+        async def run():
+            first = asyncio.ensure_future(async_qr.agenerate("first"))
+            second = asyncio.ensure_future(async_qr.agenerate("second"))
+            await asyncio.sleep(0.05)
+            second.cancel()
+            release.set()
+            self.assertEqual(await first, "first")
+            with self.assertRaises(asyncio.CancelledError):
+                await second
+            with self.assertRaises(ValueError):
+                await asyncio.wait_for(async_qr.aencode_png(np.zeros((0, 0, 3), dtype=np.uint8)), 5)
+            self.assertEqual(await async_qr.agenerate("third"), "third")
+
+        asyncio.run(run())
+        async_qr.close()
+        self.assertEqual(started, ["first", "third"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+import unittest
+import os
+import json
+import tempfile
+import cv2
+import numpy as np
+from custom_qr.bulk import generate_bulk, get_versions, read_payloads, write_bulk
+from custom_qr.custom_qr import CustomQR
+from custom_qr.generate_qr import GenerateQR
+from custom_qr.constraints import ERROR_CORRECTION_LEVEL_L, ERROR_CORRECTION_LEVEL_Q
+
+class TestGenerateBulk(unittest.TestCase):
+    def test_same_matrices(self):
+        """The symbols come back in input order, the same generate gives."""
+        qr = GenerateQR()
+        payloads = ["https://example.com/%d" % index for index in range(40)] + ["x" * 150, "1"]
+        symbols = generate_bulk(payloads, workers=2, chunk_size=8)
+        self.assertEqual(len(symbols), len(payloads))
+        for data, (matrix, version) in zip(payloads, symbols):
+            expected, expected_version = qr.generate(data, None, ERROR_CORRECTION_LEVEL_Q)
+            self.assertEqual(version, expected_version)
+            np.testing.assert_array_equal(matrix, expected)
+        self.assertEqual(generate_bulk([], workers=1), [])
+
+    def test_render(self):
+        """Rendered images are the draw_qr ones."""
+        style = {"background": (240, 240, 240), "block_style": {"size": 3, "type": 1, "color": [(0, 0, 90)]}}
+        payloads = ["a", "b" * 60, "c"]
+        images = generate_bulk(payloads, workers=2, chunk_size=2, render=True, style=style)
+        for data, (img, version) in zip(payloads, images):
+            matrix, _ = GenerateQR().generate(data, None, ERROR_CORRECTION_LEVEL_Q)
+            np.testing.assert_array_equal(img, CustomQR().draw_qr(matrix, **style))
+
+    def test_invalid_pool(self):
+        """Workers and chunk sizes below 1 are rejected."""
+        for options in ({"chunk_size": 0}, {"chunk_size": -3}, {"workers": 0}):
+            with self.assertRaises(ValueError):
+                generate_bulk(["a"], **options)
+
+    def test_versions(self):
+        """Versions are the lowest holding each payload, and a given version must hold them all."""
+        self.assertEqual(get_versions(["1", "x" * 100], None, ERROR_CORRECTION_LEVEL_L), [1, 5])
+        with self.assertRaises(ValueError):
+            get_versions(["x" * 100], 1, ERROR_CORRECTION_LEVEL_L)
+        with self.assertRaises(ValueError):
+            get_versions(["x" * 3000], None, ERROR_CORRECTION_LEVEL_L)
+
+class TestWriteBulk(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_read_payloads(self):
+        """CSV and JSONL files are read as dicts, other payloads are put under the column."""
+        csv_path = os.path.join(self.directory.name, "rows.csv")
+        with open(csv_path, "w", encoding="utf-8") as file:
+            file.write("sku,url\nA1,https://x.io/1\n")
+        jsonl_path = os.path.join(self.directory.name, "rows.jsonl")
+        with open(jsonl_path, "w", encoding="utf-8") as file:
+            file.write(json.dumps({"url": "a", "id": 1}) + "\n\n" + json.dumps("b") + "\n")
+        self.assertEqual(list(read_payloads(csv_path)), [{"sku": "A1", "url": "https://x.io/1"}])
+        self.assertEqual(list(read_payloads(jsonl_path, column="url")), [{"url": "a", "id": 1}, {"url": "b"}])
+        self.assertEqual(list(read_payloads(iter(["c", {"data": "d"}]))), [{"data": "c"}, {"data": "d"}])
+        with self.assertRaises(ValueError):
+            list(read_payloads(csv_path, format="xml"))
+
+    def test_write(self):
+        """Every row is written in order to its templated path, with the draw_qr image."""
+        style = {"block_style": {"size": 2, "type": 0, "color": [(0, 0, 0)]}}
+        rows = [{"sku": "S%d" % index, "data": "https://x.io/%d" % index} for index in range(30)]
+        filename = os.path.join(self.directory.name, "out", "{sku}-{index}.png")
+        written = list(write_bulk(iter(rows), filename, style=style, workers=2, chunk_size=4, window=2))
+        self.assertEqual([index for index, _ in written], list(range(30)))
+        index, path = written[7]
+        self.assertEqual(os.path.basename(path), "S7-7.png")
+        matrix, _ = GenerateQR().generate(rows[7]["data"], None, ERROR_CORRECTION_LEVEL_Q)
+        np.testing.assert_array_equal(cv2.imread(path), CustomQR().draw_qr(matrix, **style))
+
+    def test_missing_field(self):
+        """A row without the payload or a file name field, or with a payload of another type, is an error naming them."""
+        filename = os.path.join(self.directory.name, "{sku}.png")
+        with self.assertRaisesRegex(ValueError, "row 1 has no field 'data'"):
+            list(write_bulk([{"data": "a", "sku": "A"}, {"url": "b", "sku": "B"}], filename, workers=1))
+        with self.assertRaisesRegex(ValueError, "row 0 has no field 'sku'"):
+            list(write_bulk(["a"], filename, workers=1))
+        jsonl_path = os.path.join(self.directory.name, "rows.jsonl")
+        with open(jsonl_path, "w", encoding="utf-8") as file:
+            file.write(json.dumps({"data": 5, "sku": "A"}) + "\n" + json.dumps({"data": None, "sku": "B"}) + "\n")
+        with self.assertRaisesRegex(ValueError, "row 1 field 'data' is not a string or a number"):
+            list(write_bulk(jsonl_path, filename, workers=1))
+        written = list(write_bulk(iter([123]), os.path.join(self.directory.name, "{index}.png"), workers=1))
+        matrix, _ = GenerateQR().generate("123", None, ERROR_CORRECTION_LEVEL_Q)
+        np.testing.assert_array_equal(cv2.imread(written[0][1]), CustomQR().draw_qr(matrix))
+
+    def test_invalid_pool(self):
+        """Workers, chunk sizes and windows below 1 are rejected."""
+        filename = os.path.join(self.directory.name, "{index}.png")
+        for options in ({"chunk_size": 0}, {"chunk_size": -3}, {"window": 0}, {"workers": -1}):
+            with self.assertRaises(ValueError):
+                list(write_bulk(["a"], filename, **options))
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_stop_early(self):
+        """Stopping the iteration stops reading the rows."""
+        rows = ("x%d" % index for index in range(10 ** 9))
+        filename = os.path.join(self.directory.name, "{index}.png")
+        written = write_bulk(rows, filename, workers=1, chunk_size=2, window=2)
+        self.assertEqual(next(written)[0], 0)
+        written.close()
+        self.assertLessEqual(len(os.listdir(self.directory.name)), 4)
+
+    def test_checkpoint(self):
+        """A stopped run resumes, skipping the images written unless they changed."""
+        rows = ["https://x.io/%d" % index for index in range(40)]
+        options = {"filename": os.path.join(self.directory.name, "out", "{index}.png"), "workers": 1, "chunk_size": 4,
+                   "checkpoint": os.path.join(self.directory.name, "job.ckpt"), "checkpoint_interval": 5}
+        written = write_bulk(rows, **options)
+        for index, _ in written:
+            if index == 12:
+                break
+        written.close()
+        with open(options["checkpoint"], encoding="utf-8") as file:
+            self.assertEqual(json.load(file)["offset"], 13)
+
+        changed = options["filename"].format(index=3)
+        with open(changed, "wb") as file:
+            file.write(b"changed")
+        written = [index for index, _ in write_bulk(rows, **options)]
+        self.assertEqual(written, [3] + list(range(13, 40)))
+        self.assertEqual([index for index, _ in write_bulk(rows, **options)], [])
+        self.assertEqual(sorted(os.listdir(self.directory.name)), ["job.ckpt", "job.ckpt.3.manifest", "out"])
+        matrix, _ = GenerateQR().generate(rows[3], None, ERROR_CORRECTION_LEVEL_Q)
+        np.testing.assert_array_equal(cv2.imread(changed), CustomQR().draw_qr(matrix))
+
+    def test_checkpoint_source(self):
+        """Rows whose payload or options changed since the previous run are written again."""
+        rows = ["https://x.io/%d" % index for index in range(6)]
+        options = {"filename": os.path.join(self.directory.name, "{index}.png"), "workers": 1, "chunk_size": 2,
+                   "checkpoint": os.path.join(self.directory.name, "job.ckpt")}
+        list(write_bulk(rows, **options))
+        rows[2] = "changed"
+        self.assertEqual([index for index, _ in write_bulk(rows, **options)], [2])
+        matrix, _ = GenerateQR().generate("changed", None, ERROR_CORRECTION_LEVEL_Q)
+        np.testing.assert_array_equal(cv2.imread(options["filename"].format(index=2)), CustomQR().draw_qr(matrix))
+        written = write_bulk(rows, error_correction=ERROR_CORRECTION_LEVEL_L, **options)
+        self.assertEqual([index for index, _ in written], list(range(6)))
+
+    def test_checkpoint_previous_manifest(self):
+        """The manifest of the previous run is removed once the checkpoint stops pointing to it."""
+        rows = ["https://x.io/%d" % index for index in range(20)]
+        options = {"filename": os.path.join(self.directory.name, "out", "{index}.png"), "workers": 1, "chunk_size": 2,
+                   "checkpoint": os.path.join(self.directory.name, "job.ckpt"), "checkpoint_interval": 2}
+        written = write_bulk(rows, **options)
+        for index, _ in written:
+            if index == 5:
+                break
+        written.close()
+        written = write_bulk(rows, **options)
+        self.assertEqual(next(written)[0], 6)
+        # still running, as if it had been killed here
+        self.assertEqual(sorted(os.listdir(self.directory.name)), ["job.ckpt", "job.ckpt.2.manifest", "out"])
+        written.close()
+
+    def test_checkpoint_directory(self):
+        """The directory of the checkpoint is created with it."""
+        directory = os.path.join(self.directory.name, "out")
+        written = list(write_bulk(["a", "b"], os.path.join(directory, "{index}.png"), workers=1,
+                                  checkpoint=os.path.join(directory, "job.ckpt")))
+        self.assertEqual([index for index, _ in written], [0, 1])
+        with open(os.path.join(directory, "job.ckpt"), encoding="utf-8") as file:
+            self.assertEqual(json.load(file)["offset"], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import os
+import io
+import tempfile
+import argparse
+from contextlib import redirect_stdout, redirect_stderr
+import cv2
+import numpy as np
+from custom_qr.cli import main, parse_color
+from custom_qr.custom_qr import CustomQR
+from custom_qr.generate_qr import GenerateQR
+from custom_qr.constraints import ERROR_CORRECTION_LEVEL_H
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def run_main(self, argv):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            status = main(argv)
+        return status, output.getvalue()
+
+    def test_parse_color(self):
+        """Colors are given as R,G,B or #RRGGBB."""
+        self.assertEqual(parse_color("1,2,3"), (1, 2, 3))
+        self.assertEqual(parse_color("#0a10ff"), (10, 16, 255))
+        for value in ("1,2", "0,0,256", "#12345", "red"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_color(value)
+
+    def test_generate(self):
+        """The image is the draw_qr one of the options."""
+        path = os.path.join(self.directory.name, "qr.png")
+        status, _ = self.run_main(["generate", "https://example.com", "-o", path, "--ec", "H", "--mask", "3",
+                                   "--block-size", "2", "--color", "10,20,30"])
+        self.assertEqual(status, 0)
+        matrix, _ = GenerateQR().generate("https://example.com", None, ERROR_CORRECTION_LEVEL_H, "fixed", 3)
+        expected = CustomQR().draw_qr(matrix, block_style={"size": 2, "type": 0, "color": [(10, 20, 30)]})
+        np.testing.assert_array_equal(cv2.imread(path), expected)
+        status, _ = self.run_main(["generate", "x" * 100, "--version", "1"])
+        self.assertEqual(status, 1)
+
+    def test_bulk(self):
+        """Every row of the file is written."""
+        path = os.path.join(self.directory.name, "rows.csv")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("id,data\n" + "".join("%d,https://x.io/%d\n" % (index, index) for index in range(10)))
+        output_dir = os.path.join(self.directory.name, "out")
+        status, output = self.run_main(["bulk", path, "-o", output_dir, "--filename", "qr-{id}.png", "--workers", "1",
+                                        "--block-size", "1"])
+        self.assertEqual(status, 0)
+        self.assertTrue(output.startswith("10 images written"))
+        self.assertEqual(sorted(os.listdir(output_dir)), sorted("qr-%d.png" % index for index in range(10)))
+        status, _ = self.run_main(["bulk", path, "-o", output_dir, "--column", "url", "--workers", "1"])
+        self.assertEqual(status, 1)
+
+    def test_bench(self):
+        """Every stage is reported."""
+        status, output = self.run_main(["bench", "--count", "5", "--block-size", "1"])
+        self.assertEqual(status, 0)
+        for stage in ("encode", "error correction", "mask", "render", "png encode", "total"):
+            self.assertIn(stage + ":", output)
+        with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            main(["bench", "--count", "0"])
+
+    def test_invalid_format(self):
+        """An image format OpenCV can't encode is an error message."""
+        errors = io.StringIO()
+        with redirect_stderr(errors):
+            status, _ = self.run_main(["generate", "hi", "-o", os.path.join(self.directory.name, "qr.xyz")])
+            self.assertEqual(status, 1)
+            status, _ = self.run_main(["bench", "--count", "1", "--format", "xyz"])
+            self.assertEqual(status, 1)
+        self.assertIn("custom-qr: error: Can't encode the image as .xyz", errors.getvalue())
+
+    def test_invalid_numbers(self):
+        """Sizes and counts below 1, and a negative progress interval, are rejected."""
+        path = os.path.join(self.directory.name, "rows.csv")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("data\na\n")
+        for option in ("--workers", "--chunk-size", "--window", "--checkpoint-interval", "--block-size"):
+            for value in ("0", "-3"):
+                with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+                    main(["bulk", path, option, value])
+        with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            main(["bulk", path, "--progress", "-1"])
+        with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            main(["generate", "hi", "--block-size", "0"])
+
+if __name__ == '__main__':
+    unittest.main()
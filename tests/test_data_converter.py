@@ -0,0 +1,148 @@
+import unittest
+from custom_qr.bit_buffer import BitBuffer
+from custom_qr.dataConverter import DataConverter
+from custom_qr.capacity import CAPACITY, get_min_version
+from custom_qr.constraints import ERROR_CORRECTION_LEVEL_M, ERROR_CORRECTION_LEVEL_L, ERROR_CORRECTION_LEVEL_Q, ERROR_CORRECTION_LEVEL_H, MODE_NUMBER, MODE_ALPHANUMERIC, MODE_BYTE, MODE_KANJI, MODE_MIXED
+
+class TestBitBuffer(unittest.TestCase):
+    def test_append(self):
+        """Bits are written most significant first and the last byte is completed with zeros."""
+        buffer = BitBuffer()
+        buffer.append(0b0010, 4)
+        buffer.append(0b000001011, 9)
+        buffer.append_bytes(b'\xff')
+        self.assertEqual(len(buffer), 21)
+        self.assertEqual(buffer.to_bytes(), bytes([0b00100000, 0b01011111, 0b11111000]))
+
+class TestDataConverter(unittest.TestCase):
+    def test_known_data_codewords(self):
+        """Data codewords of the 1-M "HELLO WORLD" example of the standard."""
+        encoded_data = DataConverter(1, ERROR_CORRECTION_LEVEL_M).encode("HELLO WORLD")
+        self.assertEqual(list(encoded_data), [32, 91, 11, 120, 209, 114, 220, 77, 67, 64, 236, 17, 236, 17, 236, 17])
+
+    def test_known_numeric(self):
+        """Data codewords of the 1-M "01234567" example of the standard."""
+        encoded_data = DataConverter(1, ERROR_CORRECTION_LEVEL_M).encode("01234567")
+        self.assertEqual(list(encoded_data), [16, 32, 12, 86, 97, 128, 236, 17, 236, 17, 236, 17, 236, 17, 236, 17])
+
+    def test_segments(self):
+        """Every mode encodes its groups and its last shorter group."""
+        cases = [
+            ("0123", [(12, 10), (3, 4)]),
+            ("01234", [(12, 10), (34, 7)]),
+            ("AC-4", [(10 * 45 + 12, 11), (41 * 45 + 4, 11)]),
+            ("AC-", [(10 * 45 + 12, 11), (41, 6)]),
+            ("点茗", [(0xD9F, 13), (0x1AAA, 13)]),
+        ]
+        for data, groups in cases:
+            dataConverter = DataConverter(1, ERROR_CORRECTION_LEVEL_L)
+            data, encoding_mode = dataConverter._detect_mode(data)
+            dataConverter.VALUE_GEN_MAP[encoding_mode](data)
+            expected = BitBuffer()
+            for value, length in groups:
+                expected.append(value, length)
+            self.assertEqual(len(dataConverter._buffer), len(expected))
+            self.assertEqual(dataConverter._buffer.to_bytes(), expected.to_bytes())
+
+    def test_detect_mode(self):
+        """The tightest mode is detected along with the bytes its encoder uses."""
+        cases = [
+            ("", b"", MODE_NUMBER),
+            ("0123456789", b"0123456789", MODE_NUMBER),
+            ("HELLO WORLD", b"HELLO WORLD", MODE_ALPHANUMERIC),
+            ("Hello", b"Hello", MODE_BYTE),
+            ("caf\xe9", b"caf\xe9", MODE_BYTE),
+            ("\u0663", "\u0663".encode('utf-8'), MODE_BYTE),
+            ("点茗", "点茗".encode('shift-jis'), MODE_KANJI),
+            ("点 茗", "点 茗".encode('utf-8'), MODE_BYTE),
+        ]
+        for data, encoded_data, encoding_mode in cases:
+            self.assertEqual(DataConverter()._detect_mode(data), (encoded_data, encoding_mode))
+
+    def test_byte_count(self):
+        """The character count of byte mode is the number of bytes."""
+        encoded_data = DataConverter(1, ERROR_CORRECTION_LEVEL_L).encode("\u00e9\u20ac")
+        # mode 0100, count 00000101 (5 UTF-8 bytes)
+        self.assertEqual(encoded_data[:2], bytes([0b01000000, 0b01011100]))
+
+    def test_mixed_segments(self):
+        """Mixed mode splits the data in the segments giving the shortest bit stream."""
+        dataConverter = DataConverter(None, ERROR_CORRECTION_LEVEL_L, MODE_MIXED)
+        self.assertEqual(dataConverter._get_mixed_segments("https://example.com/items/123456789012345678901234567890", 0),
+                         [(MODE_BYTE, b"https://example.com/items/"), (MODE_NUMBER, b"123456789012345678901234567890")])
+        self.assertEqual(dataConverter._get_mixed_segments("ABCDEFGH1234567890123abc", 0),
+                         [(MODE_ALPHANUMERIC, b"ABCDEFGH"), (MODE_NUMBER, b"1234567890123"), (MODE_BYTE, b"abc")])
+        # a short numeric run isn't worth its header
+        self.assertEqual(dataConverter._get_mixed_segments("item-12-x", 0), [(MODE_BYTE, b"item-12-x")])
+        # empty data is encoded as in the default mode
+        self.assertEqual(DataConverter(1, ERROR_CORRECTION_LEVEL_L, MODE_MIXED).encode(""),
+                         DataConverter(1, ERROR_CORRECTION_LEVEL_L).encode(""))
+        self.assertTrue(DataConverter(None, ERROR_CORRECTION_LEVEL_L, MODE_MIXED).fits(b""))
+
+    def test_mixed_version(self):
+        """Mixed mode needs a lower version for data with long numeric runs."""
+        data = "https://example.com/items/" + "1234567890" * 6
+        self.assertLess(len(DataConverter(None, ERROR_CORRECTION_LEVEL_L, MODE_MIXED).encode(data)),
+                        len(DataConverter(None, ERROR_CORRECTION_LEVEL_L).encode(data)))
+
+    def test_forced_mode(self):
+        """A forced mode is used when the data allows it."""
+        self.assertEqual(DataConverter(mode=MODE_BYTE)._get_segment("123"), (MODE_BYTE, b"123"))
+        self.assertEqual(DataConverter(mode=MODE_ALPHANUMERIC)._get_segment("123"), (MODE_ALPHANUMERIC, b"123"))
+        self.assertEqual(DataConverter(mode=MODE_BYTE)._get_segment("点"), (MODE_BYTE, "点".encode('utf-8')))
+        with self.assertRaises(ValueError):
+            DataConverter(mode=MODE_NUMBER).encode("12A")
+        with self.assertRaises(ValueError):
+            DataConverter(mode=3)
+
+    def test_binary_data(self):
+        """bytes, bytearray and memoryview data are encoded as is in byte mode."""
+        expected = DataConverter(1, ERROR_CORRECTION_LEVEL_L).encode("\xe9t\xe9")
+        for data in (b"\xe9t\xe9", bytearray(b"\xe9t\xe9"), memoryview(b"_\xe9t\xe9_")[1:4],
+                     memoryview(b"\xe9_t_\xe9")[::2]):
+            self.assertEqual(DataConverter(1, ERROR_CORRECTION_LEVEL_L).encode(data), expected)
+        self.assertEqual(DataConverter()._get_segment(b"123")[0], MODE_BYTE)
+        self.assertEqual(DataConverter(mode=MODE_MIXED)._get_mixed_segments(b"\xff" + b"1" * 20, 0),
+                         [(MODE_BYTE, b"\xff"), (MODE_NUMBER, b"1" * 20)])
+        with self.assertRaises(ValueError):
+            DataConverter(mode=MODE_NUMBER).encode(b"123")
+
+    def test_structured_append_header(self):
+        """A Structured Append symbol starts with its index, total and parity, counted in its size."""
+        encoded_data = DataConverter(1, ERROR_CORRECTION_LEVEL_L, structured_append=(1, 3, 0x5A)).encode("A")
+        # 0011, index 0001, total - 1 0010, parity 01011010, then 0010 for alphanumeric
+        self.assertEqual(encoded_data[:3], bytes([0b00110001, 0b00100101, 0b10100010]))
+        self.assertEqual(DataConverter().get_parity("AB"), ord("A") ^ ord("B"))
+        self.assertTrue(DataConverter(1, ERROR_CORRECTION_LEVEL_L).fits("1" * 41))
+        self.assertFalse(DataConverter(1, ERROR_CORRECTION_LEVEL_L, structured_append=(0, 2, 0)).fits("1" * 41))
+        with self.assertRaises(ValueError):
+            DataConverter(structured_append=(2, 2, 0))
+
+class TestCapacity(unittest.TestCase):
+    def test_capacity_table(self):
+        """Capacities match the table of the standard."""
+        self.assertEqual([CAPACITY[1][ERROR_CORRECTION_LEVEL_L][mode] for mode in (MODE_NUMBER, MODE_ALPHANUMERIC, MODE_BYTE, MODE_KANJI)], [41, 25, 17, 10])
+        self.assertEqual([CAPACITY[27][ERROR_CORRECTION_LEVEL_Q][mode] for mode in (MODE_NUMBER, MODE_ALPHANUMERIC, MODE_BYTE, MODE_KANJI)], [1933, 1172, 805, 496])
+        self.assertEqual([CAPACITY[40][ERROR_CORRECTION_LEVEL_H][mode] for mode in (MODE_NUMBER, MODE_ALPHANUMERIC, MODE_BYTE, MODE_KANJI)], [3057, 1852, 1273, 784])
+        self.assertEqual(get_min_version(17, ERROR_CORRECTION_LEVEL_L, MODE_BYTE), 1)
+        self.assertEqual(get_min_version(18, ERROR_CORRECTION_LEVEL_L, MODE_BYTE), 2)
+        self.assertIsNone(get_min_version(2954, ERROR_CORRECTION_LEVEL_L, MODE_BYTE))
+
+    def test_version_selection(self):
+        """The version holds the headers, and data filling the capacity shortens the terminator."""
+        data = "1" * 41
+        dataConverter = DataConverter(None, ERROR_CORRECTION_LEVEL_L)
+        self.assertTrue(dataConverter.fits(data))
+        self.assertEqual(dataConverter.get_min_version(data), 1)
+        encoded_data = dataConverter.encode(data)
+        self.assertEqual(dataConverter.version, 1)
+        self.assertEqual(len(encoded_data), 19)
+        self.assertFalse(DataConverter(1, ERROR_CORRECTION_LEVEL_L).fits(data + "1"))
+        self.assertEqual(DataConverter(None, ERROR_CORRECTION_LEVEL_L).get_min_version(data + "1"), 2)
+        # 19 bytes and their header don't fit in the 19 data codewords of version 1-L
+        self.assertEqual(DataConverter(None, ERROR_CORRECTION_LEVEL_L).get_min_version("https://example.com"), 2)
+        with self.assertRaises(ValueError):
+            DataConverter(1, ERROR_CORRECTION_LEVEL_L).encode("https://example.com")
+
+if __name__ == '__main__':
+    unittest.main()
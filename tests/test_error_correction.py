@@ -0,0 +1,58 @@
+import unittest
+import random
+import numpy as np
+from custom_qr.errorCorrection import ErrorCorrection, GF256
+from custom_qr.constraints import EC_CODEWORDS, ERROR_CORRECTION_LEVEL_M, ERROR_CORRECTION_LEVEL_Q
+
+class TestErrorCorrection(unittest.TestCase):
+    def setUp(self):
+        self.ec = ErrorCorrection()
+
+    def test_known_codewords(self):
+        """EC codewords of the 1-M "HELLO WORLD" example of the standard."""
+        data = [32, 91, 11, 120, 209, 114, 220, 77, 67, 64, 236, 17, 236, 17, 236, 17]
+        self.assertEqual(self.ec.getEDC(data, 26), [196, 35, 39, 119, 235, 215, 231, 226, 93, 23])
+
+    def test_remainder_matches_division(self):
+        """The LFSR remainder matches the polynomial division by the generator."""
+        rng = random.Random(8)
+        for degree in (7, 10, 13, 18, 22, 26, 30):
+            generator_poly = self.ec.get_generator_poly(degree)
+            for _ in range(5):
+                data = [rng.randrange(256) for _ in range(rng.randrange(1, 124))]
+                expected = self.ec.poly_rest(data + [0] * degree, generator_poly)
+                self.assertEqual(self.ec.getEDC(data, len(data) + degree), expected)
+
+    def test_shared_tables(self):
+        """Every ErrorCorrection uses the module-level field and cached generators."""
+        self.assertIs(ErrorCorrection().LOG, ErrorCorrection().LOG)
+        self.assertIs(GF256.get_generator_poly(10), GF256.get_generator_poly(10))
+        self.assertEqual(self.ec.mul(0x53, 0xCA), GF256.MUL[0xCA][0x53])
+
+    def test_batched_blocks(self):
+        """The vectorized encoder gives the EC codewords of getEDC for every block."""
+        blocks = np.random.default_rng(9).integers(0, 256, (2, 5, 15), dtype=np.uint8)
+        ec_blocks = self.ec.getEDCs(blocks, 18)
+        self.assertEqual(ec_blocks.shape, (2, 5, 18))
+        for block, ec_block in zip(blocks.reshape(-1, 15), ec_blocks.reshape(-1, 18)):
+            self.assertEqual(ec_block.tolist(), self.ec.getEDC(block.tolist(), 33))
+
+    def test_batched_symbols(self):
+        """Group 1 and group 2 blocks of many symbols are encoded in one pass."""
+        rng = np.random.default_rng(10)
+        for version, error_correction in ((1, ERROR_CORRECTION_LEVEL_M), (5, ERROR_CORRECTION_LEVEL_Q), (40, ERROR_CORRECTION_LEVEL_Q)):
+            table = EC_CODEWORDS[version][error_correction]
+            data = rng.integers(0, 256, (3, table[0]), dtype=np.uint8)
+            ec_blocks = self.ec.get_symbols_EDC(data, version, error_correction)
+            self.assertEqual(ec_blocks.shape, (3, table[2] + table[4], table[1]))
+            for symbol, symbol_ec_blocks in zip(data.tolist(), ec_blocks):
+                start = 0
+                for block, ec_block in enumerate(symbol_ec_blocks):
+                    block_size = table[3] if block < table[2] else table[5]
+                    expected = self.ec.getEDC(symbol[start:start + block_size], block_size + table[1])
+                    self.assertEqual(ec_block.tolist(), expected)
+                    start += block_size
+            np.testing.assert_array_equal(self.ec.get_symbols_EDC(data[0], version, error_correction), ec_blocks[0])
+
+if __name__ == '__main__':
+    unittest.main()
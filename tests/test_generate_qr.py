@@ -0,0 +1,331 @@
+import unittest
+import numpy as np
+from custom_qr.layout import get_layout, get_alignment_coordinates, FORMAT_INFORMATION, VERSION_INFORMATION
+from custom_qr.generate_qr import GenerateQR
+from custom_qr.errorCorrection import ErrorCorrection
+from custom_qr.dataConverter import DataConverter
+from custom_qr.penalty import get_penalty_scores, get_pruned_mask_index
+from custom_qr.bitboard import get_bitboard
+from custom_qr.constraints import (
+    EC_CODEWORDS, ERROR_CORRECTION_LEVEL_L, ERROR_CORRECTION_LEVEL_Q, ERROR_CORRECTION_LEVEL_H,
+    MASK_STRATEGY_FULL, MASK_STRATEGY_PRUNED, MASK_STRATEGY_FIXED, ENGINE_NUMPY, ENGINE_BITBOARD, MODE_BYTE, MODE_MIXED
+)
+
+class TestLayout(unittest.TestCase):
+    def test_layout_is_cached(self):
+        """The layout is built once per version and shared."""
+        self.assertIs(get_layout(7), get_layout(7))
+        self.assertFalse(get_layout(7).template.flags.writeable)
+
+    def test_alignment_coordinates(self):
+        """Alignment pattern tracks match the table of the standard."""
+        self.assertEqual(get_alignment_coordinates(7), [6, 22, 38])
+        self.assertEqual(get_alignment_coordinates(32), [6, 34, 60, 86, 112, 138])
+        self.assertEqual(get_alignment_coordinates(36), [6, 24, 50, 76, 102, 128, 154])
+
+    def test_data_modules(self):
+        """Every data module is free and the codewords fit in the data area."""
+        for version in range(1, 41):
+            layout = get_layout(version)
+            for table in EC_CODEWORDS[version].values():
+                total_codewords = table[0] + table[1] * (table[2] + table[4])
+                self.assertEqual(table[0], table[2] * table[3] + table[4] * table[5])
+                self.assertEqual(len(layout.rows) // 8, total_codewords)
+            self.assertEqual(len(layout.rows), np.count_nonzero(~layout.reserved))
+            self.assertFalse(layout.reserved[layout.rows, layout.columns].any())
+
+    def test_information_tables(self):
+        """Format and version information match the strings of the standard."""
+        self.assertEqual(''.join(map(str, FORMAT_INFORMATION[ERROR_CORRECTION_LEVEL_L][0])), "111011111000100")
+        self.assertEqual(''.join(map(str, FORMAT_INFORMATION[ERROR_CORRECTION_LEVEL_Q][7])), "010101111101101")
+        self.assertEqual(''.join(map(str, VERSION_INFORMATION[7])), "000111110010010100")
+        self.assertEqual(''.join(map(str, VERSION_INFORMATION[40])), "101000110001101001")
+        self.assertEqual(len(VERSION_INFORMATION), 34)
+
+class TestCodewords(unittest.TestCase):
+    def test_interleave(self):
+        """Codewords are interleaved column by column over the blocks, data then EC."""
+        qr = GenerateQR()
+        ec = ErrorCorrection()
+        rng = np.random.default_rng(10)
+        for version, error_correction in ((1, ERROR_CORRECTION_LEVEL_L), (5, ERROR_CORRECTION_LEVEL_Q), (26, ERROR_CORRECTION_LEVEL_Q), (40, ERROR_CORRECTION_LEVEL_H)):
+            table = EC_CODEWORDS[version][error_correction]
+            data = rng.integers(0, 256, table[0]).tolist()
+            blocks = []
+            for block in range(table[2] + table[4]):
+                block_size = table[3] if block < table[2] else table[5]
+                start = sum(len(previous) for previous in blocks)
+                blocks.append(data[start:start + block_size])
+            ec_blocks = [ec.getEDC(block, len(block) + table[1]) for block in blocks]
+            expected = [block[c] for c in range(max(table[3], table[5])) for block in blocks if c < len(block)]
+            expected += [ec_block[c] for c in range(table[1]) for ec_block in ec_blocks]
+            codewords = qr.get_codewords(data, version, error_correction)
+            self.assertEqual(codewords.dtype, np.uint8)
+            self.assertEqual(codewords.tolist(), expected)
+
+class TestStructuredAppend(unittest.TestCase):
+    def test_parts(self):
+        """The data is split in the fewest, or the given number of, parts that each fit."""
+        qr = GenerateQR()
+        data = "structured append " * 400
+        parts = qr.get_structured_parts(data, error_correction=ERROR_CORRECTION_LEVEL_L)
+        self.assertEqual(len(parts), 3)
+        self.assertEqual("".join(parts), data)
+        parts = qr.get_structured_parts(data[:500], symbols=4, error_correction=ERROR_CORRECTION_LEVEL_L)
+        self.assertEqual([len(part) for part in parts], [125] * 4)
+        with self.assertRaises(ValueError):
+            qr.get_structured_parts("x" * 2953 * 17, error_correction=ERROR_CORRECTION_LEVEL_L)
+        with self.assertRaises(ValueError):
+            qr.get_structured_parts(data, symbols=2, version=10)
+        # no empty part
+        self.assertEqual(qr.get_structured_parts("abc", symbols=3), ["a", "b", "c"])
+        # a strided view is copied
+        self.assertEqual(qr.get_structured_parts(memoryview(b"a_b_c")[::2], symbols=3), [b"a", b"b", b"c"])
+        with self.assertRaises(ValueError):
+            qr.get_structured_parts("abc", symbols=16)
+
+    def test_symbols(self):
+        """Every symbol is the one generated alone with its Structured Append header."""
+        qr = GenerateQR()
+        data = b"\x00\xff" * 300
+        symbols = qr.generate_structured(data, symbols=3, error_correction=ERROR_CORRECTION_LEVEL_Q)
+        self.assertEqual(len(symbols), 3)
+        parity = DataConverter().get_parity(data)
+        for index, (matrix, version) in enumerate(symbols):
+            expected, expected_version = qr.generate(data[index * 200:(index + 1) * 200], None, ERROR_CORRECTION_LEVEL_Q, structured_append=(index, 3, parity))
+            self.assertEqual(version, expected_version)
+            np.testing.assert_array_equal(matrix, expected)
+
+    def test_parity(self):
+        """The parity is the one of the bytes the parts are stored with."""
+        qr = GenerateQR()
+        cases = [("日本語", MODE_BYTE, 3, 222), ("\xe9" * 5 + "日", None, 2, 0xC3 ^ 0xA9 ^ 0xE6 ^ 0x97 ^ 0xA5)]
+        for data, mode, symbols, parity in cases:
+            parts = qr.get_structured_parts(data, symbols, None, ERROR_CORRECTION_LEVEL_Q, mode)
+            generated = qr.generate_structured(data, symbols, None, ERROR_CORRECTION_LEVEL_Q, mode=mode)
+            for index, (part, (matrix, version)) in enumerate(zip(parts, generated)):
+                expected, _ = qr.generate(part, None, ERROR_CORRECTION_LEVEL_Q, mode=mode, structured_append=(index, symbols, parity))
+                np.testing.assert_array_equal(matrix, expected)
+
+    def test_charset(self):
+        """The parts joined give back the data: they share the charset of the whole data."""
+        qr = GenerateQR()
+        cases = [("\xe9" * 5 + "日", None, 2), ("ab" + "日本語" * 3, None, 2), ("\xe9" * 6 + "日" * 3, MODE_MIXED, 3),
+                 ("\xe9t\xe9" * 4, None, 3), ("日本語" * 2, None, 3)]
+        for data, mode, symbols in cases:
+            parts = qr.get_structured_parts(data, symbols, None, ERROR_CORRECTION_LEVEL_Q, mode)
+            self.assertEqual(len(parts), symbols)
+            if isinstance(parts[0], bytes):
+                self.assertEqual(b"".join(parts).decode("utf-8"), data)
+            else:
+                self.assertEqual("".join(parts), data)
+        # latin-1 and kanji parts keep their tighter encoding
+        self.assertEqual(qr.get_structured_parts("日本語" * 2, 3), ["日本", "語日", "本語"])
+
+class TestGenerateMany(unittest.TestCase):
+    def test_same_matrices(self):
+        """Every payload gets the symbol generate gives it, with both engines and every mask strategy."""
+        payloads = ["https://example.com/%d" % index for index in range(0, 2000, 150)] + ["x" * 200, b"\x00\xff", "点茗"]
+        for engine in (ENGINE_BITBOARD, ENGINE_NUMPY):
+            qr = GenerateQR(engine)
+            for mask_strategy, mask in ((MASK_STRATEGY_FULL, None), (MASK_STRATEGY_PRUNED, None), (MASK_STRATEGY_FIXED, 1)):
+                symbols = qr.generate_many(payloads, None, ERROR_CORRECTION_LEVEL_Q, mask_strategy, mask)
+                self.assertEqual(len(symbols), len(payloads))
+                for data, (matrix, version) in zip(payloads, symbols):
+                    expected, expected_version = qr.generate(data, None, ERROR_CORRECTION_LEVEL_Q, mask_strategy, mask)
+                    self.assertEqual(version, expected_version)
+                    np.testing.assert_array_equal(matrix, expected)
+
+    def test_stack(self):
+        """Stacked symbols are grouped by version with the index of their payload."""
+        qr = GenerateQR()
+        payloads = ["1", "x" * 100, "2"]
+        stacks = qr.generate_many(payloads, stack=True)
+        self.assertEqual(sorted(stacks), [1, 5])
+        indices, matrices = stacks[1]
+        self.assertEqual(indices.tolist(), [0, 2])
+        self.assertEqual(matrices.shape, (2, 21, 21))
+        np.testing.assert_array_equal(matrices[1], qr.generate("2")[0])
+        self.assertEqual(qr.generate_many([]), [])
+
+class TestTemplate(unittest.TestCase):
+    def test_same_matrices(self):
+        """A template generates the matrices of its text and value encoded as separate segments."""
+        qr = GenerateQR()
+        for pattern in ("https://x.io/t/{id}", "{}", "ITEM-{}-END"):
+            for mask_strategy, mask in ((MASK_STRATEGY_FULL, None), (MASK_STRATEGY_FIXED, 2)):
+                template = qr.template(pattern, None, ERROR_CORRECTION_LEVEL_Q, mask_strategy, mask)
+                for value in ("", 7, "123456", "9" * 100, "AB-12", "abc", "点茗", "x" * 300):
+                    segments = template._prefix_segments + [DataConverter()._get_segment(str(value))] + template._suffix_segments
+                    dataConverter = DataConverter(None, ERROR_CORRECTION_LEVEL_Q)
+                    encoded_data = dataConverter.encode_segments(segments)
+                    codewords = qr.get_codewords(encoded_data, dataConverter.version, ERROR_CORRECTION_LEVEL_Q)
+                    expected = qr.get_optimal_mask(codewords, dataConverter.version, ERROR_CORRECTION_LEVEL_Q, mask_strategy, mask)
+                    matrix, version = template.generate(value)
+                    self.assertEqual(version, dataConverter.version)
+                    np.testing.assert_array_equal(matrix, expected)
+        with self.assertRaises(ValueError):
+            qr.template("https://x.io/{a}/{b}")
+
+class TestMasks(unittest.TestCase):
+    def setUp(self):
+        self.qr = GenerateQR()
+
+    def test_mask_matrices(self):
+        """The stacked candidates match the masks applied module by module."""
+        MASK_FNS = [
+            lambda row, column: ((row + column) & 1) == 0,
+            lambda row, column: (row & 1) == 0,
+            lambda row, column: column % 3 == 0,
+            lambda row, column: (row + column) % 3 == 0,
+            lambda row, column: (((row >> 1) + column // 3) & 1) == 0,
+            lambda row, column: ((row * column) & 1) + ((row * column) % 3) == 0,
+            lambda row, column: ((((row * column) & 1) + ((row * column) % 3)) & 1) == 0,
+            lambda row, column: ((((row + column) & 1) + ((row * column) % 3)) & 1) == 0,
+        ]
+        version = 8
+        codewords = list(np.random.default_rng(8).integers(0, 256, 242))
+        matrices = self.qr.get_mask_matrices(codewords, version, ERROR_CORRECTION_LEVEL_L)
+        self.assertEqual(matrices.shape, (8, 49, 49))
+        sequence = self.qr.get_module_sequence(codewords, version, ERROR_CORRECTION_LEVEL_L)
+        for mask_index, matrix in enumerate(matrices):
+            for index, (row, column) in enumerate(sequence[:len(codewords) * 8]):
+                bit = (codewords[index >> 3] >> (7 - (index & 7))) & 1
+                self.assertEqual(matrix[row, column], bit ^ int(MASK_FNS[mask_index](row, column)))
+            np.testing.assert_array_equal(matrix, self.qr.get_mask_matrix(mask_index, codewords, version, ERROR_CORRECTION_LEVEL_L))
+
+def reference_penalty_score(matrix):
+    """Module by module scorer the vectorized one has to match."""
+    def get_line_penalty(line):
+        count = 0
+        counting = None
+        penalty = 0
+        for cell in line:
+            if cell != counting:
+                counting = cell
+                count = 1
+            else:
+                count += 1
+                if count == 5:
+                    penalty += 3
+                elif count > 5:
+                    penalty += 1
+        return penalty
+
+    RULE_3_PATTERN = np.array([1, 0, 1, 1, 1, 0, 1, 0, 0, 0, 0], dtype=np.uint8)
+    RULE_3_REVERSED_PATTERN = RULE_3_PATTERN[::-1]
+    total_penalty = 0
+    # Rule 1
+    total_penalty += sum(get_line_penalty(row) for row in matrix)
+    total_penalty += sum(get_line_penalty(matrix[:, column_index]) for column_index in range(matrix.shape[1]))
+    # Rule 2
+    blocks = 0
+    size = matrix.shape[0]
+    for row in range(size - 1):
+        for column in range(size - 1):
+            module = matrix[row, column]
+            if (matrix[row, column + 1] == module and
+                matrix[row + 1, column] == module and
+                matrix[row + 1, column + 1] == module):
+                blocks += 1
+    total_penalty += blocks * 3
+    # Rule 3
+    patterns = 0
+    for index in range(size):
+        row = matrix[index]
+        for column_index in range(size - 11):
+            if any(np.array_equal(pattern, row[column_index:column_index + 11]) for pattern in [RULE_3_PATTERN, RULE_3_REVERSED_PATTERN]):
+                patterns += 1
+        for row_index in range(size - 11):
+            if any(np.array_equal(pattern, matrix[row_index:row_index + 11, index]) for pattern in [RULE_3_PATTERN, RULE_3_REVERSED_PATTERN]):
+                patterns += 1
+    total_penalty += patterns * 40
+    # Rule 4
+    percentage = np.sum(matrix) * 100 / (size * size)
+    return total_penalty + abs(int(percentage / 5 - 10)) * 10
+
+class TestPenalty(unittest.TestCase):
+    def test_reference_equivalence(self):
+        """The batched scorer gives the same scores as the module by module one."""
+        qr = GenerateQR()
+        rng = np.random.default_rng(3)
+        for version in (1, 2, 7, 14):
+            size = get_layout(version).size
+            codewords = list(rng.integers(0, 256, len(get_layout(version).rows) // 8))
+            candidates = qr.get_mask_matrices(codewords, version, ERROR_CORRECTION_LEVEL_L)
+            # sparse and dense random matrices exercise long runs and unbalanced colors
+            noise = (rng.random((3, size, size)) < np.array([0.1, 0.5, 0.9])[:, None, None]).astype(candidates.dtype)
+            stack = np.concatenate((candidates, noise))
+            expected = [reference_penalty_score(matrix) for matrix in stack]
+            self.assertEqual(get_penalty_scores(stack).tolist(), expected)
+            self.assertEqual(qr.get_penalty_score(stack[0]), expected[0])
+
+    def test_pruned_mask(self):
+        """The pruned selection picks the same mask as the full one."""
+        qr = GenerateQR()
+        rng = np.random.default_rng(4)
+        # version 25 is above PRUNING_MIN_SIZE
+        for version in (1, 3, 9, 25):
+            count = len(get_layout(version).rows) // 8
+            for _ in range(10):
+                candidates = qr.get_mask_matrices(list(rng.integers(0, 256, count)), version, ERROR_CORRECTION_LEVEL_Q)
+                self.assertEqual(get_pruned_mask_index(candidates), np.argmin(get_penalty_scores(candidates)))
+        data = "https://example.com/items/123456"
+        np.testing.assert_array_equal(qr.generate(data, mask_strategy=MASK_STRATEGY_PRUNED)[0], qr.generate(data)[0])
+
+    def test_fixed_mask(self):
+        """The fixed strategy uses the given mask and rejects missing ones."""
+        qr = GenerateQR()
+        data = "https://example.com"
+        matrix, version = qr.generate(data, mask_strategy=MASK_STRATEGY_FIXED, mask=5)
+        codewords = qr.get_codewords(qr.get_encoded_data(data, None, ERROR_CORRECTION_LEVEL_L)[0], version, ERROR_CORRECTION_LEVEL_L)
+        np.testing.assert_array_equal(matrix, qr.get_mask_matrix(5, codewords, version, ERROR_CORRECTION_LEVEL_L))
+        with self.assertRaises(ValueError):
+            qr.generate(data, mask_strategy=MASK_STRATEGY_FIXED)
+        with self.assertRaises(ValueError):
+            qr.generate(data, mask_strategy="fast")
+
+class TestBitboard(unittest.TestCase):
+    def test_candidates_and_scores(self):
+        """Every bitboard candidate and its score match the numpy ones."""
+        numpy_qr = GenerateQR(ENGINE_NUMPY)
+        rng = np.random.default_rng(5)
+        for version in (1, 4, 7, 12, 40):
+            bitboard = get_bitboard(version)
+            codewords = rng.integers(0, 256, len(get_layout(version).rows) // 8).tolist()
+            candidates = numpy_qr.get_mask_matrices(codewords, version, ERROR_CORRECTION_LEVEL_H)
+            data, filled = bitboard._get_data(codewords)
+            formats = bitboard._get_formats(ERROR_CORRECTION_LEVEL_H)
+            for mask_index, expected in enumerate(candidates):
+                rows, columns = bitboard.get_candidate(data, filled, formats, mask_index)
+                np.testing.assert_array_equal(bitboard.to_matrix(rows), expected)
+                np.testing.assert_array_equal(bitboard.to_matrix(columns), expected.T)
+                self.assertEqual(bitboard.get_penalty_score(rows, columns), get_penalty_scores(expected))
+
+    def test_pruned_mask(self):
+        """The pruned bitboard selection picks the same mask as the full one."""
+        rng = np.random.default_rng(6)
+        for version in (1, 3, 9, 19):
+            bitboard = get_bitboard(version)
+            formats = bitboard._get_formats(ERROR_CORRECTION_LEVEL_Q)
+            for _ in range(10):
+                data, filled = bitboard._get_data(rng.integers(0, 256, len(get_layout(version).rows) // 8).tolist())
+                candidates = [bitboard.get_candidate(data, filled, formats, mask_index) for mask_index in range(8)]
+                scores = [bitboard.get_penalty_score(*candidate) for candidate in candidates]
+                self.assertEqual(bitboard.get_pruned_mask_index(candidates), scores.index(min(scores)))
+
+    def test_same_matrices(self):
+        """Both engines generate the same matrices with every mask strategy."""
+        numpy_qr = GenerateQR(ENGINE_NUMPY)
+        bitboard_qr = GenerateQR(ENGINE_BITBOARD)
+        for data in ("https://example.com", "0123456789" * 5, "HELLO WORLD", "x" * 200):
+            for mask_strategy, mask in ((MASK_STRATEGY_FULL, None), (MASK_STRATEGY_PRUNED, None), (MASK_STRATEGY_FIXED, 6)):
+                expected, version = numpy_qr.generate(data, None, ERROR_CORRECTION_LEVEL_Q, mask_strategy, mask)
+                matrix, _ = bitboard_qr.generate(data, None, ERROR_CORRECTION_LEVEL_Q, mask_strategy, mask)
+                self.assertEqual(matrix.dtype, np.uint8)
+                np.testing.assert_array_equal(matrix, expected)
+        with self.assertRaises(ValueError):
+            GenerateQR("gpu")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import os
+import tempfile
+import threading
+import cv2
+import numpy as np
+from custom_qr.image_writer import ImageWriter, encode_image
+from custom_qr.qrCode import QrCode
+
+class TestImageWriter(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        qr = QrCode()
+        self.img = qr.create_qr_image(qr.generate("https://example.com")[0])
+
+    def test_write(self):
+        """Every queued image is written, and its future gives the encoded bytes."""
+        paths = [os.path.join(self.directory.name, "out", "%d.png" % index) for index in range(10)]
+        with ImageWriter(workers=2, queue_size=3) as writer:
+            futures = [writer.write(self.img, path) for path in paths]
+        for path, future in zip(paths, futures):
+            np.testing.assert_array_equal(cv2.imread(path), self.img)
+            with open(path, "rb") as file:
+                self.assertEqual(file.read(), future.result())
+        self.assertEqual(QrCode().encode_png(self.img), encode_image(self.img))
+
+    def test_bounded_queue(self):
+        """write blocks while the queue is full."""
+        release = threading.Event()
+        writer = ImageWriter(workers=1, queue_size=2)
+        writer._write = lambda img, filename: release.wait()
+        writer.write(self.img, "a.png")
+        writer.write(self.img, "b.png")
+        blocked = threading.Thread(target=writer.write, args=(self.img, "c.png"))
+        blocked.start()
+        blocked.join(0.2)
+        self.assertTrue(blocked.is_alive())
+        release.set()
+        blocked.join()
+        writer.close()
+
+    def test_errors(self):
+        """An error is raised by the next flush, write or close, once."""
+        writer = ImageWriter(workers=1)
+        writer.write(self.img, os.path.join(self.directory.name, "qr.unknown"))
+        with self.assertRaises(ValueError):
+            writer.flush()
+        writer.flush()
+        writer.write(self.img, os.path.join(self.directory.name, "qr.unknown"))
+        with self.assertRaises(ValueError):
+            writer.close()
+        with self.assertRaises(ValueError):
+            writer.write(self.img, os.path.join(self.directory.name, "qr.png"))
+
+if __name__ == '__main__':
+    unittest.main()
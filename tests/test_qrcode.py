@@ -16,6 +16,21 @@ class TestQrCode(unittest.TestCase):
         self.assertIsNotNone(matrix)  # Ensure matrix is not None
         self.assertEqual(matrix.shape[0], 21)  # Check the shape for version 1
 
+    def test_pack_matrix(self):
+        """Test the uint8 matrix and its bit-packed form."""
+        matrix, version = self.qr.generate("https://example.com", version=self.version)
+        self.assertEqual(matrix.dtype, np.uint8)
+        packed = self.qr.pack_matrix(matrix)
+        self.assertEqual(packed.shape, (41, 6))
+        np.testing.assert_array_equal(self.qr.unpack_matrix(packed), matrix)
+
+    def test_create_structured_image(self):
+        """Test tiling the symbols of a Structured Append sequence."""
+        symbols = self.qr.generate_structured("https://example.com", symbols=3)
+        img = self.qr.create_structured_image([matrix for matrix, version in symbols], columns=2)
+        size = max(len(matrix) for matrix, version in symbols) * 10
+        self.assertEqual(img.shape, (2 * size + 40, 2 * size + 40, 3))
+
     def test_create_qr_image(self):
         """Test creating a QR code image."""
         data = "https://example.com"